@@ -0,0 +1,45 @@
+"""
+Measures how collect_data scales with the number of worker processes on a synthetic module tree.
+
+Run from the repository root (so config.env is found):
+
+    python -m benchmarks.collect_scaling --packages 2000 --versions 5 --max-workers 8
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from benchmarks.synthetic import make_module_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collect_data across 1..N worker processes.")
+    parser.add_argument("--packages", type=int, default=2000, help="Packages per modulepath")
+    parser.add_argument("--versions", type=int, default=5, help="Versions per package")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count(), help="Largest worker count to time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modulepaths = make_module_tree(os.path.join(tmp, "apps"), args.packages, args.versions)
+        # Environment variables take precedence over config.env, so set them before importing mods2docs
+        os.environ["MODULEPATHS"] = json.dumps(modulepaths)
+        os.environ["DATA_DIR"] = os.path.join(tmp, "data")
+        os.makedirs(os.environ["DATA_DIR"])
+
+        from mods2docs import collect_data, utils
+        parser_module = utils.load_module("parser", "lmod")
+        module_files = sum(len(paths) for paths in parser_module.gather_lua_paths_by_arch().values())
+        print(f"Synthetic tree: {module_files} module files across {len(modulepaths)} architectures")
+
+        baseline = None
+        for workers in range(1, args.max_workers + 1):
+            start = time.perf_counter()
+            collect_data.collect_data(parser_module, workers, full=True)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} {elapsed:8.2f}s  speedup={baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares the size and load time of collected data stored as a pickle and in mods2docs.data_format.
+
+Run from the repository root (so config.env is found):
+
+    python -m benchmarks.data_format --packages 5000
+"""
+import os
+import time
+import pickle
+import random
+import argparse
+import tempfile
+from mods2docs import data_format
+
+
+def make_collected_data(packages, versions=5, archs=("icelake", "znver3"), seed=0):
+    """Builds collected data shaped like collect_data's output, with each module also listed under All."""
+    rng = random.Random(seed)
+    package_infos = {arch: {} for arch in archs}
+    latest_version_info = {}
+    for i in range(packages):
+        package = f"pkg{i}"
+        category = rng.choice(["Bio", "Chem", "Lib", "Tools"])
+        for arch in archs:
+            modulepath = f"/opt/apps/testapps/el7-{arch}/modules/staging"
+            package_versions = [f"{rng.randint(1, 12)}.{rng.randint(0, 20)}-GCCcore-12.2.0" for _ in range(versions)]
+            suffix = package.upper()
+            module_info = {
+                "WhatIs Information": [f"Description: {package} is a synthetic package for benchmarking.",
+                                       f"Homepage: https://example.org/{package}",
+                                       f"URL: https://example.org/{package}"],
+                "Loaded Modules": [f"pkg{rng.randrange(packages)}/1.0" for _ in range(rng.randint(0, 4))],
+                "Root": f"/opt/apps/software/{package}/{package_versions[0]}",
+                "EB Variables": {
+                    "EBROOT": {"value": f"/opt/apps/software/{package}/{package_versions[0]}", "var_name": f"EBROOT{suffix}"},
+                    "EBVERSION": {"value": package_versions[0].split('-')[0], "var_name": f"EBVERSION{suffix}"},
+                },
+                "EB Version": package_versions[0].split('-')[0],
+            }
+            for group in ("All", category):
+                for version in package_versions:
+                    package_infos[arch][f"{group}|{package}|{version}"] = (
+                        f"{modulepath}/{group.lower()}/{package}/{version}.lua", version)
+                latest_version_info.setdefault(f"{group}|{package}", {})[arch] = (module_info, "2024-11-05", None)
+    return {'package_infos': package_infos, 'latest_version_info': latest_version_info}
+
+
+def timed(function, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the collected data format against pickle.")
+    parser.add_argument("--packages", type=int, default=5000, help="Number of packages")
+    args = parser.parse_args()
+
+    data = make_collected_data(args.packages)
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_file = os.path.join(tmp, "collected-data.pkl")
+        data_file = os.path.join(tmp, "collected-data.m2d")
+        with open(pickle_file, 'wb') as f:
+            pickle.dump(data, f)
+        data_format.save(data_file, data)
+        assert data_format.load(data_file) == data
+
+        def load_pickle():
+            with open(pickle_file, 'rb') as f:
+                pickle.load(f)
+
+        print(f"{args.packages} packages")
+        print(f"pickle:      {os.path.getsize(pickle_file) / 1e6:7.2f} MB  full load {timed(load_pickle):6.3f}s")
+        print(f"data format: {os.path.getsize(data_file) / 1e6:7.2f} MB  full load "
+              f"{timed(lambda: data_format.load(data_file)):6.3f}s  "
+              f"header only {timed(lambda: data_format.load(data_file, header_only=True)):6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
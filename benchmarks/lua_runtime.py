@@ -0,0 +1,46 @@
+"""
+Compares the per-file cost of executing module files in a fresh LuaRuntime against the shared runtime.
+
+Run from the repository root (so config.env is found):
+
+    python -m benchmarks.lua_runtime --files 2000
+"""
+import os
+import time
+import argparse
+import tempfile
+from benchmarks.synthetic import make_module_tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LuaRuntime construction against runtime reuse.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of module files to execute")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        from mods2docs.parser import lmod
+
+        make_module_tree(os.path.join(tmp, "apps"), packages=args.files // 5 + 1, versions=5, archs=())
+        module_files = []
+        for dirpath, _, filenames in os.walk(os.path.join(tmp, "apps", "common", "modules", "all")):
+            module_files.extend(os.path.join(dirpath, filename) for filename in filenames)
+        contents = [(path, lmod.read_lua_file(path)) for path in module_files[:args.files]]
+
+        start = time.perf_counter()
+        for path, content in contents:
+            lmod.execute_lua(lmod.setup_lua_runtime(), content, path)
+        fresh = (time.perf_counter() - start) / len(contents)
+
+        start = time.perf_counter()
+        for path, content in contents:
+            lmod.execute_lua(lmod.get_lua_runtime(), content, path)
+        shared = (time.perf_counter() - start) / len(contents)
+
+        print(f"{len(contents)} module files")
+        print(f"fresh runtime per file:  {fresh * 1e6:8.1f} us/file")
+        print(f"shared runtime:          {shared * 1e6:8.1f} us/file  ({fresh / shared:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
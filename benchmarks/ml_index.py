@@ -0,0 +1,64 @@
+"""
+Shows how finding the versions of each package for its ml file scales with the number of modules,
+comparing a scan of package_infos per package against the index built once by build_ml_index.
+
+Run from the repository root (so config.env is found):
+
+    python -m benchmarks.ml_index --modules 20000
+"""
+import time
+import random
+import argparse
+from mods2docs.writer import rest
+
+
+def make_package_infos(modules, versions=5, archs=("icelake", "znver3"), seed=0):
+    """Builds package_infos as stored in collected data, with ``modules`` modules per architecture."""
+    rng = random.Random(seed)
+    packages = [f"pkg{i}" for i in range(modules // versions)]
+    return {
+        arch: {
+            f"{rng.choice(['All', 'Bio', 'Lib'])}|{package}|{v}.0-GCC-12.2.0": (None, f"{v}.0-GCC-12.2.0")
+            for package in packages for v in range(versions)
+        }
+        for arch in archs
+    }
+
+
+def versions_by_scan(package, package_infos):
+    """Finds a package's versions the way write_ml_file did before build_ml_index."""
+    return {arch: [key.split('|')[2] for key in infos if key.split('|')[1] == package]
+            for arch, infos in package_infos.items()}
+
+
+def versions_by_index(package, ml_index):
+    return ml_index.get(package, {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ml-file version lookups against an index.")
+    parser.add_argument("--modules", type=int, default=20000, help="Largest number of modules per architecture")
+    args = parser.parse_args()
+
+    for modules in (args.modules // 4, args.modules // 2, args.modules):
+        package_infos = make_package_infos(modules)
+        packages = sorted({key.split('|')[1] for infos in package_infos.values() for key in infos})
+
+        # Scanning is quadratic, so time a sample of packages and extrapolate
+        sample = packages[:200]
+        start = time.perf_counter()
+        for package in sample:
+            versions_by_scan(package, package_infos)
+        scan = (time.perf_counter() - start) * len(packages) / len(sample)
+
+        start = time.perf_counter()
+        ml_index = rest.build_ml_index(package_infos)
+        for package in packages:
+            versions_by_index(package, ml_index)
+        index = time.perf_counter() - start
+
+        print(f"{modules:>7} modules  scan: {scan:8.2f}s (extrapolated)  index: {index:6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
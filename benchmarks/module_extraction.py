@@ -0,0 +1,61 @@
+"""
+Measures per-file throughput of extracting module information from module files, separately from executing them,
+and of parsing module files.
+
+Run from the repository root (so config.env is found):
+
+    python -m benchmarks.module_extraction --files 2000
+"""
+import os
+import time
+import argparse
+import tempfile
+from benchmarks.synthetic import make_module_tree
+
+
+def per_file(function, items, repeat):
+    """Returns the mean time in seconds of calling function on each item."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            function(*item)
+    return (time.perf_counter() - start) / (len(items) * repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark module information extraction per module file.")
+    parser.add_argument("--files", type=int, default=2000, help="Number of module files to parse")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of passes over the module files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATA_DIR"] = tmp
+        from mods2docs.parser import lmod
+
+        make_module_tree(os.path.join(tmp, "apps"), packages=args.files // 5 + 1, versions=5, archs=())
+        module_files = []
+        for dirpath, _, filenames in os.walk(os.path.join(tmp, "apps", "common", "modules", "all")):
+            module_files.extend(os.path.join(dirpath, filename) for filename in filenames)
+        module_files = module_files[:args.files]
+
+        lua = lmod.get_lua_runtime()
+        executed = []
+        for path in module_files:
+            content = lmod.read_lua_file(path)
+            env_vars = lmod.execute_lua(lua, content, path)
+            if env_vars is not None:
+                executed.append((content, env_vars))
+
+        patterns = per_file(lmod.extract_patterns, [(content,) for content, _ in executed], args.repeat)
+        extract = per_file(lmod.extract_module_info, executed, args.repeat)
+        parse = per_file(lmod.parse_lua_file, [(path,) for path in module_files], args.repeat)
+
+        print(f"{len(module_files)} module files, {sum(len(content) for content, _ in executed) / len(executed):.0f} "
+              f"bytes on average")
+        print(f"extract_patterns:     {patterns * 1e6:8.1f} us/file  {1 / patterns:10.0f} files/s")
+        print(f"extract_module_info:  {extract * 1e6:8.1f} us/file  {1 / extract:10.0f} files/s")
+        print(f"parse_lua_file:       {parse * 1e6:8.1f} us/file  {1 / parse:10.0f} files/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares scanning modulepaths with os.scandir (gather_lua_paths_by_arch) against the glob.glob crawl it replaced.
+
+Run from the repository root (so config.env is found):
+
+    python -m benchmarks.modulepath_scan --packages 2000 --threads 4
+"""
+import os
+import glob
+import json
+import time
+import argparse
+import tempfile
+from benchmarks.synthetic import make_module_tree
+
+
+def glob_lua_paths_by_arch(modulepaths):
+    """The glob-based scan gather_lua_paths_by_arch used before, as the baseline."""
+    paths_by_arch = {arch: mp.replace('/all', '').split(':') for arch, mp in modulepaths.items()}
+    return {
+        arch: [
+            (file, '/'.join(file.split('/')[-3:]).replace('.lua', ''))
+            for path in paths
+            for file in glob.glob(os.path.join(path, '*/*/*.lua'))
+        ]
+        for arch, paths in paths_by_arch.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark modulepath scanning.")
+    parser.add_argument("--packages", type=int, default=2000, help="Packages per modulepath")
+    parser.add_argument("--versions", type=int, default=5, help="Versions per package")
+    parser.add_argument("--threads", type=int, default=4, help="Scanner threads for the concurrent scan")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modulepaths = make_module_tree(os.path.join(tmp, "apps"), args.packages, args.versions)
+        os.environ["MODULEPATHS"] = json.dumps(modulepaths)
+        os.environ["DATA_DIR"] = tmp
+        from mods2docs.parser import lmod
+
+        start = time.perf_counter()
+        expected = glob_lua_paths_by_arch(modulepaths)
+        timings = {"glob.glob": time.perf_counter() - start}
+        for threads in sorted({1, args.threads}):
+            start = time.perf_counter()
+            scanned = lmod.gather_lua_paths_by_arch(threads)
+            timings[f"os.scandir, {threads} thread(s)"] = time.perf_counter() - start
+            assert scanned == expected, "scan results differ from glob"
+
+        print(f"{sum(len(paths) for paths in expected.values())} module paths across {len(modulepaths)} architectures")
+        for name, seconds in timings.items():
+            print(f"{name:26} {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Runs the full collect_data -> start_pipeline path on a synthetic module tree and compares the results
+against a stored baseline.
+
+Each stage runs in its own process, with a temporary config.env pointing at the synthetic tree, and is timed
+with its peak RSS and the number of files it handled:
+
+    collect             collect_data --full, parsing every module file
+    pipeline            start_pipeline with the rest writer, writing every output file
+    collect (cached)    collect_data again, with every module file in the parse cache
+    pipeline (no-op)    start_pipeline again, with no output file changed
+
+Run from the repository root:
+
+    python -m benchmarks.suite --repeat 3 --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --packages 2000 --save-baseline my-baseline.json
+    python -m benchmarks.suite --packages 2000 --baseline my-baseline.json --threshold 0.2
+
+benchmarks/baseline.json is the committed baseline of the default parameters.
+
+The exit status is 1 if any stage is slower, or uses more memory, than the baseline by more than the threshold.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from dotenv import dotenv_values
+from benchmarks.synthetic import make_module_tree, CATEGORIES
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings config.py reads, taken from the repository's config.env unless the suite sets them
+CONFIG_KEYS = ["CURRENT_DATE_FORMAT", "SLURM_INTERACTIVE_SESSION_IMPORT", "BROKEN_SYMLINKS_FILE", "LOG_FILE",
+               "MAIN_LOG_FILE", "DATA_FILE", "PARSE_CACHE_FILE", "MODULE_CLASSES"]
+
+# Metrics compared against the baseline, lower being better
+COMPARED_METRICS = ("seconds", "peak_rss_mb")
+
+
+def write_config(work_dir, modulepaths):
+    """Writes a config.env in work_dir for the synthetic modulepaths, with all output under work_dir."""
+    settings = {key: value for key, value in dotenv_values(os.path.join(REPO_ROOT, "config.env")).items()
+                if key in CONFIG_KEYS}
+    settings.update({
+        "DATA_DIR": os.path.join(work_dir, "data"),
+        "IMPORTS_DIR": os.path.join(work_dir, "referenceinfo", "imports", "packages"),
+        "STACKS_DIR": os.path.join(work_dir, "stacks"),
+        "CUSTOM_DIR": os.path.join(work_dir, "referenceinfo", "imports", "packages", "custom"),
+        "MODULEPATHS": json.dumps(modulepaths),
+        "TITLES": json.dumps(["Synthetic Packages"]),
+        "OUTPUT_DIRS": json.dumps(["synthetic"]),
+    })
+    os.makedirs(settings["DATA_DIR"], exist_ok=True)
+    with open(os.path.join(work_dir, "config.env"), 'w') as file:
+        for key, value in settings.items():
+            file.write(f"{key}='{value}'\n")
+    return settings
+
+
+def run_stage(command, work_dir):
+    """
+    Runs a mods2docs command in work_dir, so it reads the config.env there.
+
+    Returns:
+        tuple: (seconds, peak RSS in MB, standard output).
+    """
+    # Settings in the environment would take precedence over config.env
+    env = {key: value for key, value in os.environ.items() if key not in CONFIG_KEYS and key not in
+           ("DATA_DIR", "IMPORTS_DIR", "STACKS_DIR", "CUSTOM_DIR", "MODULEPATHS", "TITLES", "OUTPUT_DIRS")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")]))
+    with tempfile.TemporaryFile('w+') as output:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-m", *command], cwd=work_dir, env=env, stdout=output,
+                                   stderr=subprocess.STDOUT)
+        # wait4 reports the resource usage of this process alone, including the workers it waited for
+        _, status, rusage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        text = output.read()
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} exited with status {process.returncode}:\n{text[-2000:]}")
+    return seconds, rusage.ru_maxrss / 1024, text
+
+
+def collected_files(output):
+    """Number of module files found by collect_data, from its output."""
+    match = re.search(r"Module files: (\d+) found", output)
+    return int(match.group(1)) if match else 0
+
+
+def written_files(settings):
+    """Number of output files start_pipeline wrote and left unchanged, from the last run in its main log."""
+    with open(os.path.join(settings["DATA_DIR"], settings["MAIN_LOG_FILE"])) as file:
+        counts = re.findall(r"Output files: (\d+) written, (\d+) unchanged", file.read())
+    return (int(counts[-1][0]), int(counts[-1][1])) if counts else (0, 0)
+
+
+def run_suite(args, work_dir):
+    """Generates the synthetic tree in work_dir and runs each stage once, returning their metrics by name."""
+    modulepaths = make_module_tree(os.path.join(work_dir, "apps"), args.packages, args.versions,
+                                   tuple(args.archs.split(',')), args.dependencies, args.broken_symlinks,
+                                   args.seed, CATEGORIES[:args.categories])
+    settings = write_config(work_dir, modulepaths)
+
+    collect = ["mods2docs.collect_data", "--parser", "lmod", "--workers", str(args.workers)]
+    pipeline = ["mods2docs.start_pipeline", "--parser", "lmod", "--writer", "rest",
+                "--render-workers", str(args.workers), "--write-threads", str(args.write_threads)]
+    stages = [("collect", collect + ["--full"]), ("pipeline", pipeline),
+              ("collect (cached)", collect), ("pipeline (no-op)", pipeline)]
+
+    results = {}
+    for name, command in stages:
+        seconds, peak_rss_mb, output = run_stage(command, work_dir)
+        if command[0] == "mods2docs.collect_data":
+            files = collected_files(output)
+            written = 0
+        else:
+            written, unchanged = written_files(settings)
+            files = written + unchanged
+        results[name] = {
+            "seconds": round(seconds, 3),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "files": files,
+            "files_written": written,
+            "files_per_second": round(files / seconds, 1) if seconds else 0.0,
+        }
+    return results
+
+
+def median_results(runs):
+    """Combines the results of several runs of the suite, taking the median of each metric."""
+    return {name: {metric: round(statistics.median(run[name][metric] for run in runs), 3) for metric in metrics}
+            for name, metrics in runs[0].items()}
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares each stage's metrics against the baseline.
+
+    Returns:
+        list: (stage, metric, value, baseline value, ratio) of each metric worse than the baseline by more
+            than the threshold, e.g. 0.2 for 20%.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        for metric in COMPARED_METRICS:
+            reference = baseline.get(name, {}).get(metric)
+            if reference and metrics[metric] > reference * (1 + threshold):
+                regressions.append((name, metric, metrics[metric], reference, metrics[metric] / reference))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'stage':20} {'seconds':>9} {'peak RSS':>10} {'files':>8} {'written':>8} {'files/s':>10}")
+    for name, metrics in results.items():
+        line = (f"{name:20} {metrics['seconds']:9.2f} {metrics['peak_rss_mb']:8.1f}MB {metrics['files']:8.0f} "
+                f"{metrics['files_written']:8.0f} {metrics['files_per_second']:10.1f}")
+        if baseline and name in baseline and baseline[name]["seconds"]:
+            line += f"  ({metrics['seconds'] / baseline[name]['seconds']:.2f}x baseline time)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collect_data and start_pipeline on a synthetic tree.")
+    parser.add_argument("--packages", type=int, default=1000, help="Packages per modulepath")
+    parser.add_argument("--versions", type=int, default=5, help="Versions per package")
+    parser.add_argument("--archs", default="icelake,znver3",
+                        help="Comma-separated architectures, each with its own modulepath besides the shared one")
+    parser.add_argument("--categories", type=int, default=len(CATEGORIES),
+                        help=f"Number of categories packages are spread over (at most {len(CATEGORIES)})")
+    parser.add_argument("--dependencies", type=int, default=3, help="Maximum dependencies loaded per module file")
+    parser.add_argument("--broken-symlinks", type=int, default=10, help="Dangling symlinks in the shared modulepath")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic tree")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for parsing and rendering")
+    parser.add_argument("--write-threads", type=int, default=1, help="Threads writing output files")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs of the suite, on fresh trees; the median of each metric is reported")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--save-baseline", metavar="FILE", help="Write the results to FILE as the new baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare the results against the baseline in FILE")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown or memory growth over the baseline, as a fraction (default: 0.2)")
+    args = parser.parse_args()
+
+    parameters = {key: getattr(args, key) for key in ("packages", "versions", "archs", "categories", "dependencies",
+                                                       "broken_symlinks", "seed", "workers", "write_threads")}
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as work_dir:
+            runs.append(run_suite(args, work_dir))
+    report = {
+        "parameters": parameters,
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "stages": median_results(runs),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["parameters"] != parameters:
+            print(f"Warning: {args.baseline} was recorded with different parameters: {baseline['parameters']}")
+    print_results(report["stages"], baseline["stages"] if baseline else None)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {path}")
+
+    if baseline:
+        regressions = compare(report["stages"], baseline["stages"], args.threshold)
+        for name, metric, value, reference, ratio in regressions:
+            print(f"Regression: {name} {metric} {value} vs {reference} in the baseline ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import random
+
+# Module file template modelled on EasyBuild-generated Lmod modules
+MODULE_TEMPLATE = '''help([==[
+
+Description
+===========
+{package} is a synthetic package generated for benchmarking mods2docs.
+
+
+More information
+================
+ - Homepage: https://example.org/{package}
+]==])
+
+whatis([==[Description: {package} is a synthetic package generated for benchmarking mods2docs.]==])
+whatis([==[Homepage: https://example.org/{package}]==])
+whatis([==[URL: https://example.org/{package}]==])
+
+local root = "/opt/apps/synthetic/software/{package}/{version}"
+
+conflict("{package}")
+
+{loads}
+prepend_path("CMAKE_PREFIX_PATH", root)
+prepend_path("LD_LIBRARY_PATH", pathJoin(root, "lib"))
+prepend_path("PATH", pathJoin(root, "bin"))
+setenv("EBROOT{suffix}", root)
+setenv("EBVERSION{suffix}", "{eb_version}")
+setenv("EBDEVEL{suffix}", pathJoin(root, "easybuild/{package}-{version}-easybuild-devel"))
+
+-- Built with EasyBuild version 4.9.0
+'''
+
+LOAD_TEMPLATE = '''if not ( isloaded("{dependency}") ) then
+    load("{dependency}")
+end
+'''
+
+CATEGORIES = ["bio", "chem", "compiler", "data", "devel", "lang", "lib", "math", "mpi", "numlib", "tools", "vis"]
+TOOLCHAINS = ["GCCcore-11.3.0", "GCCcore-12.2.0", "GCCcore-12.3.0", "foss-2022a", "foss-2023a", "intel-2022a"]
+
+
+def make_module_tree(root, packages=1000, versions=5, archs=("icelake", "znver3"), dependencies=3,
+                     broken_symlinks=0, seed=0, categories=CATEGORIES):
+    """
+    Generates a synthetic EasyBuild-style Lmod module tree for benchmarking.
+
+    Each architecture gets its own modulepath plus one modulepath shared between all architectures.
+    Module files live in ``all/<package>/<version>.lua`` with a symlink in the package's category
+    directory, as EasyBuild lays them out.
+
+    Args:
+        root (str): Directory in which to create the tree.
+        packages (int): Number of packages per modulepath.
+        versions (int): Number of versions per package.
+        archs (tuple): Architecture names to create modulepaths for.
+        dependencies (int): Maximum number of ``load`` calls per module file.
+        broken_symlinks (int): Number of dangling category symlinks to add to the shared modulepath.
+        seed (int): Seed for the random generator, so trees are reproducible.
+        categories (list): Category (module class) directories packages are spread over.
+
+    Returns:
+        dict: Modulepaths for each architecture, in the format of ``config.modulepaths``.
+    """
+    rng = random.Random(seed)
+    shared = os.path.join(root, "common", "modules", "all")
+    modulepaths = {arch: os.path.join(root, arch, "modules", "all") for arch in archs}
+
+    for modulepath in [shared, *modulepaths.values()]:
+        prefix = os.path.basename(os.path.dirname(os.path.dirname(modulepath)))
+        names = [f"{prefix}-pkg{i}" for i in range(packages)]
+        for package in names:
+            category = rng.choice(categories)
+            package_dir = os.path.join(modulepath, package)
+            category_dir = os.path.join(os.path.dirname(modulepath), category, package)
+            os.makedirs(package_dir, exist_ok=True)
+            os.makedirs(category_dir, exist_ok=True)
+            for _ in range(versions):
+                eb_version = f"{rng.randint(1, 12)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}"
+                version = f"{eb_version}-{rng.choice(TOOLCHAINS)}"
+                loads = "".join(
+                    LOAD_TEMPLATE.format(dependency=f"{dependency}/{rng.randint(1, 9)}.0")
+                    for dependency in rng.sample(names, rng.randint(0, dependencies))
+                )
+                suffix = package.upper().replace('-', 'MIN')
+                module_file = os.path.join(package_dir, f"{version}.lua")
+                with open(module_file, 'w') as file:
+                    file.write(MODULE_TEMPLATE.format(package=package, version=version, loads=loads,
+                                                      suffix=suffix, eb_version=eb_version))
+                link = os.path.join(category_dir, f"{version}.lua")
+                if not os.path.lexists(link):
+                    os.symlink(module_file, link)
+
+    for i in range(broken_symlinks):
+        broken_dir = os.path.join(os.path.dirname(shared), "tools", f"broken{i}")
+        os.makedirs(broken_dir, exist_ok=True)
+        os.symlink(os.path.join(root, "missing", f"broken{i}.lua"), os.path.join(broken_dir, "1.0.lua"))
+
+    return {arch: f"{modulepath}:{shared}" for arch, modulepath in modulepaths.items()}
+
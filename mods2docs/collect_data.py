@@ -1,22 +1,70 @@
 import os
+import sys
 import pickle
 import logging
 import argparse
 import importlib
-from mods2docs import utils, config
+from mods2docs import utils, config, tracing
+from mods2docs.parser import common
 
 
-def collect_data(parser_module):
-    """Collects and organises Lua module data by architecture using the specified parser module."""
-    paths_by_arch = parser_module.gather_lua_paths_by_arch()
-    sorted_paths_by_arch = parser_module.sort_paths(paths_by_arch)
+def collect_data(parser_module, workers=1, full=False, scan_threads=1, parse_all_versions=False,
+                 save_in_background=False):
+    """
+    Collects and organises Lua module data by architecture using the specified parser module.
 
-    package_infos = {arch: {} for arch in paths_by_arch}
-    latest_version_info = {}
+    Module files unchanged since the previous run are not parsed again, unless ``full`` is set.
 
-    # Process each architecture’s paths
-    for arch, paths in sorted_paths_by_arch.items():
-        parser_module.process_paths_for_architecture(paths, arch, parser_module, latest_version_info, package_infos)
+    Args:
+        parser_module (module): The parser module used to gather and parse module files.
+        workers (int): Number of worker processes used to parse module files; 1 parses serially.
+        full (bool): If True, ignore the parse cache and parse every module file again.
+        scan_threads (int): Number of modulepaths scanned concurrently.
+        parse_all_versions (bool): If True, parse every version of each package, not just the latest, and
+            save their information as ``version_infos``.
+        save_in_background (bool): If True, return while the data file is still being written,
+            see utils.save_collected_data_in_background.
+
+    Returns:
+        dict: The collected data, as saved to config.DATA_FILE.
+    """
+    # Modulepaths can be shared between architectures, so parse results are shared too.
+    version = parser_module.parser_version()
+    with tracing.span("load parse cache"):
+        parse_cache = common.new_parse_cache() if full else common.load_parse_cache(config.PARSE_CACHE_FILE, version)
+    with utils.process_pool(workers) as executor:
+        # Start parsing the newest module files of the packages found so far while modulepaths are still scanned
+        def prefetch(lua_file_paths):
+            parser_module.extract_lua_infos(lua_file_paths, parser_module, executor, parse_cache)
+
+        with tracing.span("scan modulepaths"):
+            paths_by_arch = parser_module.gather_lua_paths_by_arch(scan_threads, prefetch)
+
+        package_infos = {arch: {} for arch in paths_by_arch}
+        latest_version_info = {}
+        version_infos = {} if parse_all_versions else None
+
+        # Process each architecture’s paths
+        for arch, paths in paths_by_arch.items():
+            with tracing.span(f"process {arch}"):
+                parser_module.process_paths_for_architecture(paths, arch, parser_module, latest_version_info,
+                                                             package_infos, executor=executor,
+                                                             parse_cache=parse_cache, version_infos=version_infos)
+
+    with tracing.span("save parse cache"):
+        common.save_parse_cache(config.PARSE_CACHE_FILE, version, parse_cache)
+    # Fingerprints of the module files just scanned, see check
+    with tracing.span("fingerprint modulepaths"):
+        fingerprints = parser_module.fingerprint_modulepaths(scanned=True)
+    found = len({lua_file_path for paths in paths_by_arch.values() for lua_file_path, _ in paths})
+    message = (f"Module files: {found} found, {parse_cache['opened']} opened; "
+               f"parse cache: {parse_cache['hits']} hits, {parse_cache['misses']} misses")
+    print(message)
+    utils.append_log(message, config.log_file_path)
+    for mode, (files, seconds) in sorted(parse_cache['modes'].items()):
+        message = f"Parsed with {mode}: {files} files in {seconds:.2f}s ({seconds / files * 1e6:.0f} us/file)"
+        print(message)
+        utils.append_log(message, config.log_file_path)
 
     # Convert keys to strings for serialization
     package_infos_str_keys = {
@@ -30,25 +78,97 @@ def collect_data(parser_module):
 
     collected_data = {
         'package_infos': package_infos_str_keys,
-        'latest_version_info': latest_version_info_str_keys
+        'latest_version_info': latest_version_info_str_keys,
+        'fingerprints': fingerprints
     }
+    if version_infos is not None:
+        collected_data['version_infos'] = {
+            arch: {f"{cat}|{pkg}|{ver}": val for (cat, pkg, ver), val in infos.items()}
+            for arch, infos in version_infos.items()
+        }
 
-    utils.save_collected_data(config.DATA_FILE, collected_data)
+    if save_in_background:
+        utils.save_collected_data_in_background(config.DATA_FILE, collected_data)
+    else:
+        with tracing.span("save collected data"):
+            utils.save_collected_data(config.DATA_FILE, collected_data)
+    return collected_data
 
-def main(parser_module):
+def main(parser_module, workers=1, full=False, scan_threads=1, parse_all_versions=False,
+         save_in_background=False):
     utils.write_log(config.log_file_path)
     utils.write_log(config.broken_symlinks_file)
 
-    collect_data(parser_module)
-    parser_module.process_broken_symlinks()
+    collected_data = collect_data(parser_module, workers, full, scan_threads, parse_all_versions, save_in_background)
+    with tracing.span("process broken symlinks"):
+        parser_module.process_broken_symlinks(scan_threads)
+    return collected_data
+
+def check(parser_module, scan_threads=1):
+    """
+    Reports whether the collected data is up to date with the modulepaths, see the parser module's
+    check_collected_data.
+
+    Returns:
+        int: Exit status: 0 if the collected data is current, 1 if it is stale and 2 if it is missing.
+    """
+    state, changed = parser_module.check_collected_data(scan_threads)
+    message = f"Collected data is {state}"
+    if changed:
+        message += f", modulepaths changed: {', '.join(changed)}"
+    print(message)
+    return ('current', 'stale', 'missing').index(state)
+
+def write_profile(trace_file, top, logfile):
+    """Writes the trace of a --profile run and prints and logs its summary, see tracing.finish."""
+    for line in tracing.finish(trace_file, top) + [f"Trace written to {trace_file}"]:
+        print(line)
+        utils.append_log(line, logfile)
+
+def add_profile_arguments(parser):
+    """Adds the --profile options to an ArgumentParser, see write_profile."""
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each stage and module file parsed, and write a trace (for chrome://tracing or "
+                             "Perfetto) and a summary to DATA_DIR")
+    parser.add_argument("--profile-top", type=int, default=20, metavar="N",
+                        help="Number of slowest module files in the --profile summary (default: 20)")
+
+def add_collect_arguments(parser):
+    """Adds the options controlling data collection to an ArgumentParser, see main."""
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of processes used to parse module files (default: 1, serial)")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the parse cache and parse every module file again")
+    parser.add_argument("--scan-threads", type=int, default=1,
+                        help="Number of modulepaths scanned, and broken symlinks inspected, concurrently (default: 1)")
+    parser.add_argument("--parse-all-versions", action="store_true",
+                        help="Parse every version of each package, not just the latest, e.g. for per-version docs")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run data collection with a specified parser module.")
     parser.add_argument("--parser", default="lmod", help="Choose the parser module to use")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Write the information parsed from every module file to the log")
+    parser.add_argument("--check", action="store_true",
+                        help="Only check whether the modulepaths changed since data was last collected; exit status "
+                             "0 if not, 1 if they did and 2 if there is no collected data")
+    add_collect_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
+    utils.setup_logging(args.verbose)
+
     # Dynamically import the specified parser module
     parser_module = utils.load_module("parser", args.parser)
 
+    if args.check:
+        sys.exit(check(parser_module, args.scan_threads))
+
+    if args.profile:
+        tracing.start()
+
     # Run main with the specified parser module
-    main(parser_module)
+    main(parser_module, args.workers, args.full, args.scan_threads, args.parse_all_versions)
+
+    if args.profile:
+        write_profile(config.DATA_DIR / "profile-collect-data.json", args.profile_top, config.log_file_path)
@@ -18,9 +18,11 @@ CUSTOM_DIR = Path(os.getenv("CUSTOM_DIR"))
 
 # File paths
 broken_symlinks_file = DATA_DIR / os.getenv("BROKEN_SYMLINKS_FILE")
+broken_symlinks_report_file = broken_symlinks_file.with_suffix(".json")
 log_file_path = DATA_DIR / os.getenv("LOG_FILE")
 main_log_file = DATA_DIR / os.getenv("MAIN_LOG_FILE")
 DATA_FILE = DATA_DIR / os.getenv("DATA_FILE")
+PARSE_CACHE_FILE = DATA_DIR / os.getenv("PARSE_CACHE_FILE")
 
 # SLURM interactive session file
 SLURM_INTERACTIVE_SESSION_IMPORT = os.getenv("SLURM_INTERACTIVE_SESSION_IMPORT")
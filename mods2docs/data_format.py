@@ -0,0 +1,109 @@
+"""
+Versioned on-disk format for collected data.
+
+Layout of a file:
+
+    MAGIC                       identifies the format
+    uint32 format version       little-endian
+    uint64 header length        little-endian
+    header                      UTF-8 JSON, see below
+    data                        the collected data, pickled
+
+The header holds the architectures and, if collected, the fingerprint of each modulepath, so
+staleness can be checked by reading the header alone, without decoding the data. The data is
+``package_infos``, ``latest_version_info`` and any ``version_infos``, pickled at once: a full
+load is a single pickle.load, and each module_info shared by several categories and
+architectures is stored once.
+"""
+import gc
+import json
+import pickle
+import struct
+import argparse
+
+MAGIC = b"MODS2DOCS-DATA\n"
+FORMAT_VERSION = 1
+# Format versions load reads
+READABLE_VERSIONS = (FORMAT_VERSION,)
+_PREAMBLE = struct.Struct("<IQ")
+
+
+def save(file_path, data):
+    """
+    Saves collected data (``package_infos``, ``latest_version_info`` and any ``version_infos`` and ``fingerprints``)
+    in this format.
+
+    Args:
+        file_path (str): Path of the file to write.
+        data (dict): Collected data, as produced by collect_data.
+    """
+    header = {'archs': list(data.get('package_infos', {}))}
+    if 'fingerprints' in data:
+        header['fingerprints'] = data['fingerprints']
+    header = json.dumps(header, separators=(',', ':')).encode()
+    collected_data = {key: value for key, value in data.items() if key != 'fingerprints'}
+
+    with open(file_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_PREAMBLE.pack(FORMAT_VERSION, len(header)))
+        f.write(header)
+        pickle.dump(collected_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(file_path, header_only=False):
+    """
+    Loads collected data saved with save.
+
+    Args:
+        file_path (str): Path of the file to read.
+        header_only (bool): If True, return only the header, ``archs`` and any ``fingerprints``, without
+            decoding the data.
+
+    Returns:
+        dict: Collected data with ``package_infos``, ``latest_version_info`` and, if saved, ``version_infos``
+            and ``fingerprints``, as collect_data produces it.
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{file_path} is not a mods2docs collected data file")
+        format_version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if format_version not in READABLE_VERSIONS:
+            raise ValueError(f"{file_path} has format version {format_version}, this version of mods2docs reads "
+                             f"format versions {', '.join(map(str, READABLE_VERSIONS))}")
+        header = json.loads(f.read(header_length))
+        if header_only:
+            return header
+
+        # Decoding creates many small containers; the cyclic collector would rescan them repeatedly
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            collected_data = pickle.load(f)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    if 'fingerprints' in header:
+        collected_data['fingerprints'] = header['fingerprints']
+    return collected_data
+
+
+def is_data_file(file_path):
+    """Whether file_path is in this format (rather than, for example, a pickle from an older version)."""
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def convert_pickle(pickle_path, file_path):
+    """Converts collected data pickled by older versions of mods2docs to this format."""
+    with open(pickle_path, 'rb') as f:
+        save(file_path, pickle.load(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a collected-data pickle to the mods2docs data format.")
+    parser.add_argument("pickle_file", help="Pickle written by an older version of collect_data")
+    parser.add_argument("data_file", help="Path of the converted file, e.g. data/collected-data.m2d")
+    args = parser.parse_args()
+
+    convert_pickle(args.pickle_file, args.data_file)
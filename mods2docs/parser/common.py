@@ -1,16 +1,112 @@
+import os
+import grp
+import pwd
 import pickle
-import subprocess
+import logging
+import functools
+from mods2docs import config, utils
 
-def extract_installer(file_path):
+
+@functools.lru_cache(maxsize=None)
+def lookup_username(uid):
+    """Returns the username for a uid, resolving each uid once per run. None if the uid has no user."""
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def lookup_groupname(gid):
+    """Returns the group name for a gid, resolving each gid once per run. None if the gid has no group."""
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return None
+
+
+def new_parse_cache(stored_files=None):
+    """
+    Creates the cache of parse results for one collection run.
+
+    Args:
+        stored_files (dict, optional): Results saved by a previous run, mapping each module file path
+            to its (file signature, module_info) pair.
+
+    Returns:
+        dict: A parse cache with the keys:
+            - lua_infos (dict): (module_info, creation_date, installer) for each path handled this run.
+            - module_infos (dict): module_info for each physical file handled this run, by (st_dev, st_ino).
+            - stored (dict): Results from the previous run, reused while a file's signature is unchanged.
+            - files (dict): Results to save for the next run.
+            - hits, misses (int): Paths served from the stored results, and paths that had to be parsed.
+            - opened (int): Module files actually read and parsed; a file shared by several paths counts once.
+            - modes (dict): [files, seconds] spent parsing files by each way of parsing them, e.g. 'lua'.
+    """
+    return {'lua_infos': {}, 'module_infos': {}, 'stored': stored_files or {}, 'files': {}, 'hits': 0, 'misses': 0,
+            'opened': 0, 'modes': {}}
+
+
+def file_signature(stat):
+    """Returns the part of a file's stat result that changes whenever the file is modified or replaced."""
+    return stat.st_mtime, stat.st_ctime, stat.st_size
+
+
+def load_parse_cache(cache_file, version):
+    """
+    Loads the parse results saved by a previous run.
+
+    Results saved by a different parser version are discarded, so changes to the parsing code
+    always take effect.
+
+    Args:
+        cache_file (str): Path to the cache pickle.
+        version (str): Version of the parser code, see save_parse_cache.
+
+    Returns:
+        dict: A parse cache, see new_parse_cache.
+    """
     try:
-        result = subprocess.run(['ls', '-lrath', file_path], capture_output=True, text=True)
-        if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                parts = line.split()
-                if len(parts) > 2 and parts[2].startswith('sa_'):
-                    return parts[2][3:]
+        with open(cache_file, 'rb') as f:
+            stored = pickle.load(f)
+    except FileNotFoundError:
+        return new_parse_cache()
     except Exception as e:
-        append_log(f"Error extracting installer: {e}", config.log_file_path)
-    return None
+        utils.append_log(f"Ignoring unreadable parse cache {cache_file}: {e}", config.log_file_path)
+        return new_parse_cache()
+
+    if stored.get('version') != version:
+        utils.append_log(f"Parser version changed, ignoring parse cache {cache_file}", config.log_file_path)
+        return new_parse_cache()
+    return new_parse_cache(stored.get('files'))
+
+
+def save_parse_cache(cache_file, version, parse_cache):
+    """Saves this run's parse results, tagged with the parser version, for the next run."""
+    with open(cache_file, 'wb') as f:
+        pickle.dump({'version': version, 'files': parse_cache['files']}, f)
 
 
+def extract_installer(file_path, stat=os.stat):
+    """
+    Returns the installer of a module file, taken from its owner's username with the 'sa_' prefix stripped.
+
+    The file itself is inspected (not a symlink's target), as ``ls -l`` would.
+
+    Args:
+        file_path (str): Path of the module file.
+        stat (callable): Returns a path's stat result, taking ``follow_symlinks`` like os.stat does,
+            e.g. to reuse stat results that are already known.
+
+    Returns:
+        str or None: The installer, or None if the file is missing or not owned by an 'sa_' account.
+    """
+    try:
+        owner = lookup_username(stat(file_path, follow_symlinks=False).st_uid)
+        if owner and owner.startswith('sa_'):
+            return owner[3:]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        utils.append_log(f"Error extracting installer: {e}", config.log_file_path, level=logging.WARNING)
+    return None
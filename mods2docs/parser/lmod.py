@@ -1,80 +1,240 @@
 import os
 import re
-import glob
-import pickle
+import sys
+import json
+import queue
+import time
+import hashlib
+import logging
 import datetime
-import subprocess
+import stat as stat_module
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 from lupa import LuaRuntime
-from mods2docs import config, utils
-from mods2docs.parser.common import extract_installer
-
-
-def run_collect_data_script():
-    try:
-        result = subprocess.run(['python', '-m', 'mods2docs.collect_data'], check=True)
-        return result.returncode == 0
-    except subprocess.CalledProcessError as e:
-        utils.append_log(f"Failed to run mods2docs.collect_data: {e}", config.main_log_file)
-        print(f"Failed to run collect_data.py: {e}")
-        return False
-
-
-def ensure_data_collected():
+from mods2docs import config, utils, tracing
+from mods2docs.parser import common
+from mods2docs.parser.common import extract_installer, file_signature, new_parse_cache
+
+# Collected data shared by every title in a pipeline run, see load_package_data()
+_package_data = None
+# One pre-initialised LuaRuntime per process (and so per worker), see get_lua_runtime()
+_lua_runtime = None
+# os.DirEntry of each Lua file found by the last modulepath scan, so its stat results are reused, see stat_lua_file()
+_dir_entries = {}
+# (mtime, size) of each Lua file found by the last modulepath scan, taken as it was scanned, see file_stamp()
+_file_stamps = {}
+# Number of module files gathered before gather_lua_paths_by_arch hands them to prefetch
+_PREFETCH_BATCH_SIZE = 256
+# Splits versions into text and digit runs, see version_sort_key()
+_VERSION_PARTS = re.compile(r'(\d+)')
+# Lines read_lua_file writes to the broken symlinks file, see read_broken_symlinks()
+_BROKEN_SYMLINK_ENTRY = re.compile(r'(?:Error reading (?P<unreadable>.+?): .*|(?P<missing>.+) not found\.)')
+
+# Patterns extracted from every module file, compiled once at import. Each starts with a literal, which the
+# regex engine skips ahead to quickly; a single alternation of all of them scans the content several times slower.
+_MODULE_FILE_PATTERNS = {
+    "help_info": re.compile(r'help\(\[\=\=\[(.*?)\]\=\=\]\)', re.DOTALL),
+    "whatis_info": re.compile(r'whatis\(\[\=\=\[(.*?)\]\=\=\]\)', re.DOTALL),
+    "loaded_modules": re.compile(r'load\("(.*?)"\)'),
+    "env_vars": re.compile(r'setenv\("([^"]+)",\s*"([^"]+)"\)'),
+    "root": re.compile(r'local root = "(.*?)"')
+}
+_EBROOT_SETENV = 'setenv("EBROOT'
+
+
+def parser_version():
+    """Identifies the parsing code, so parse results cached by other versions of it are discarded."""
+    digest = hashlib.sha256()
+    for source_file in (__file__, common.__file__):
+        with open(source_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def ensure_data_collected(parser_module=None):
     """
     Ensures that the collected data is available by checking if the data file exists.
-    If not, it runs the data collection script and loads the data.
+    If not, it collects the data in this process, which also saves the data file.
+
+    Args:
+        parser_module (module, optional): The parser module to collect data with; this module if not given.
 
     Returns:
         dict or None: The collected data if available; otherwise, None.
     """
     if not os.path.exists(config.DATA_FILE):
-        print("Collected data not found. Running collect_data.py...")
-        utils.append_log("Collected data not found. Running collect_data.py...", config.main_log_file)
-        run_collect_data_script()
+        print("Collected data not found. Collecting data...")
+        utils.append_log("Collected data not found. Collecting data...", config.main_log_file)
+        # Imported here as collect_data is usually the entry point which loads this module
+        from mods2docs import collect_data
+        collected_data = collect_data.main(parser_module or sys.modules[__name__])
+    else:
+        collected_data = utils.load_collected_data(config.DATA_FILE)
 
-    collected_data = utils.load_collected_data(config.DATA_FILE)
     if not collected_data:
-        print("No collected data found even after running collect_data.py.")
-        utils.append_log("No collected data found even after running collect_data.py.", config.main_log_file)
+        print("No collected data found even after collecting data.")
+        utils.append_log("No collected data found even after collecting data.", config.main_log_file,
+                         level=logging.WARNING)
         return None
 
     return collected_data
 
 
-def process_modulepath(modulepaths, title, output_dir):
-    # Run collect_data.py if data file doesn't exist
-    collected_data = ensure_data_collected()
+def load_package_data(collected_data=None, parser_module=None):
+    """
+    Loads and indexes the collected data once per process, so every title shares the same data.
 
-    if collected_data:
-        package_infos, latest_version_info, package_ref = extract_package_info(collected_data)
-    else:
-        package_infos, latest_version_info, package_ref = None, None, None
+    Args:
+        collected_data (dict, optional): Data just collected in this process, see collect_data.main, which is
+            used instead of the collected data file.
+        parser_module (module, optional): The parser module to collect data with if there is none, see
+            ensure_data_collected.
 
+    Returns:
+        tuple: package_infos, latest_version_info and package_ref (see extract_package_info) as
+            read-only mappings, or (None, None, None) if no data could be collected.
+    """
+    global _package_data
+    if collected_data is not None:
+        _package_data = tuple(MappingProxyType(data) for data in extract_package_info(collected_data))
+    elif _package_data is None:
+        # Collect data if the data file doesn't exist
+        collected_data = ensure_data_collected(parser_module)
+        if not collected_data:
+            return None, None, None
+        _package_data = tuple(MappingProxyType(data) for data in extract_package_info(collected_data))
+    return _package_data
+
+
+def process_modulepath(modulepaths, title, output_dir):
+    package_infos, latest_version_info, package_ref = load_package_data()
     return package_infos, latest_version_info, package_ref
 
 
-def process_broken_symlinks():
+def read_broken_symlinks():
+    """
+    Returns the module file paths recorded in the broken symlinks file this run, each once, in the order found.
+
+    Returns:
+        list: The paths, or None if there is no broken symlinks file.
+    """
     if not os.path.exists(config.broken_symlinks_file):
+        return None
+
+    utils.flush_logs()
+    with open(config.broken_symlinks_file, 'r') as file:
+        lines = file.read().splitlines()
+
+    symlinks = {}
+    for line in lines:
+        match = _BROKEN_SYMLINK_ENTRY.fullmatch(line.strip())
+        if match:
+            symlinks[match.group('missing') or match.group('unreadable')] = None
+    return list(symlinks)
+
+
+def format_size(size):
+    """Formats a size in bytes the way ``ls -h`` does, e.g. 512, 4.0K or 12M."""
+    for unit in ('', 'K', 'M', 'G', 'T'):
+        if size < 1024 or unit == 'T':
+            break
+        size /= 1024
+    if not unit:
+        return str(size)
+    return f"{size:.1f}{unit}" if size < 10 else f"{size:.0f}{unit}"
+
+
+def describe_path(path):
+    """
+    Describes a path itself, without following it if it is a symlink, from one lstat (and a readlink for symlinks).
+
+    Args:
+        path (str): The path.
+
+    Returns:
+        dict: The path, whether it 'exists' and, if it does, its 'mode', 'owner', 'group', 'size', 'mtime' (ISO 8601)
+            and, for a symlink, its 'target'; otherwise the 'error'.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError as e:
+        return {'path': path, 'exists': False, 'error': e.strerror}
+
+    info = {
+        'path': path,
+        'exists': True,
+        'mode': stat_module.filemode(st.st_mode),
+        'links': st.st_nlink,
+        'owner': common.lookup_username(st.st_uid) or str(st.st_uid),
+        'group': common.lookup_groupname(st.st_gid) or str(st.st_gid),
+        'size': st.st_size,
+        'mtime': datetime.datetime.fromtimestamp(st.st_mtime).isoformat(timespec='seconds'),
+    }
+    if stat_module.S_ISLNK(st.st_mode):
+        try:
+            info['target'] = os.readlink(path)
+        except OSError as e:
+            info['target'] = None
+            info['error'] = e.strerror
+    return info
+
+
+def format_path_description(info):
+    """Formats describe_path's result as the line ``ls -ld`` prints for the path, or its error message."""
+    if not info['exists']:
+        return f"ls: cannot access '{info['path']}': {info['error']}"
+    mtime = datetime.datetime.fromisoformat(info['mtime'])
+    line = (f"{info['mode']} {info['links']} {info['owner']} {info['group']} {format_size(info['size'])} "
+            f"{mtime:%b %d %H:%M} {info['path']}")
+    if info.get('target') is not None:
+        line += f" -> {info['target']}"
+    return line
+
+
+def diagnose_broken_symlink(symlink):
+    """
+    Describes a module file path which could not be read, and the path it finally resolves to.
+
+    Args:
+        symlink (str): The module file path, usually a dangling symlink.
+
+    Returns:
+        dict: describe_path results for the 'symlink' and its 'target' (the realpath of the symlink).
+    """
+    return {'symlink': describe_path(symlink), 'target': describe_path(os.path.realpath(symlink))}
+
+
+def process_broken_symlinks(threads=1):
+    """
+    Appends a diagnosis of each module file which could not be read to the broken symlinks file, and writes
+    the same diagnoses as JSON to config.broken_symlinks_report_file.
+
+    Paths are inspected in-process with lstat and readlink, up to ``threads`` at a time (which helps on parallel
+    filesystems), and each report is written in one go.
+
+    Args:
+        threads (int): Number of paths inspected concurrently.
+    """
+    symlinks = read_broken_symlinks()
+    if symlinks is None:
         print(f"No broken symlinks file found for date: {config.current_date}")
         return
 
-    with open(config.broken_symlinks_file, 'r') as file:
-        broken_symlinks = file.readlines()
+    if threads > 1 and len(symlinks) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            diagnoses = list(pool.map(diagnose_broken_symlink, symlinks))
+    else:
+        diagnoses = [diagnose_broken_symlink(symlink) for symlink in symlinks]
 
-    utils.append_file(config.broken_symlinks_file, f"\n\nls -lrtah <file not found>\n")
-    utils.append_file(config.broken_symlinks_file, f"\nls -lrath <symlink target>\n\n")
-    for symlink in broken_symlinks:
-        symlink = symlink.strip()
-        if symlink:
-            result = subprocess.run(['ls', '-lrtah', symlink], capture_output=True, text=True)
-            utils.append_file(config.broken_symlinks_file, result.stdout)
-            utils.append_file(config.broken_symlinks_file, result.stderr)
+    lines = ["\n\nls -lrtah <file not found>", "\nls -lrath <symlink target>\n"]
+    for diagnosis in diagnoses:
+        lines.append(format_path_description(diagnosis['symlink']))
+        lines.append(format_path_description(diagnosis['target']))
+    utils.append_log('\n'.join(lines), config.broken_symlinks_file)
 
-            target = os.path.realpath(symlink)
-            if target:
-                result = subprocess.run(['ls', '-lrath', target], capture_output=True, text=True)
-                utils.append_file(config.broken_symlinks_file, result.stdout)
-                utils.append_file(config.broken_symlinks_file, result.stderr)
+    report = {'date': config.current_date, 'broken_symlinks': diagnoses}
+    with open(config.broken_symlinks_report_file, 'w') as file:
+        json.dump(report, file, indent=2)
 
 
 def extract_package_info(collected_data):
@@ -129,45 +289,66 @@ def read_lua_file(lua_file_path):
         with open(lua_file_path, 'r') as file:
             return file.read()
     except FileNotFoundError:
-        log_message = f"{lua_file_path} not found.\n"
-        print(log_message.strip())
-        utils.append_file(config.broken_symlinks_file, log_message)
+        log_message = f"{lua_file_path} not found."
+        print(log_message)
+        utils.append_log(log_message, config.broken_symlinks_file, level=logging.WARNING)
         return None
     except Exception as e:
-        log_message = f"Error reading {lua_file_path}: {e}\n"
-        print(log_message.strip())
-        utils.append_file(config.broken_symlinks_file, log_message)
+        log_message = f"Error reading {lua_file_path}: {e}"
+        print(log_message)
+        utils.append_log(log_message, config.broken_symlinks_file, level=logging.WARNING)
         return None
 
 
 def setup_lua_runtime() -> LuaRuntime:
+    """
+    Creates a LuaRuntime with stubs for the Lmod functions used in module files.
+
+    Module files are run through ``run_module``, which executes each one in a fresh environment
+    table, so ``env_vars`` and auto-created globals never leak from one module file to the next.
+    """
     lua = LuaRuntime(unpack_returned_tuples=True)
 
     try:
         lua.execute('''
-        function help(msg) end
-        function whatis(msg) end
-        function prepend_path(var, value) end
-        function append_path(var, value) end
-        function setenv(var, value) _G.env_vars[var] = value end
-        function unsetenv(var) end
-        function load(module) end
-        function unload(module) end
-        function conflict(module) end
-        function family(module) end
-        function add_property(var, value) end
-        function remove_property(var) end
-        function isloaded(module) return false end
-        function pathJoin(...) return table.concat({...}, "/") end
-
-        setmetatable(_G, {
-            __index = function(_, key)
-                _G[key] = function(...) end
-                return _G[key]
-            end
-        })
-
-        _G.env_vars = {}
+        local chunk_load = load
+        local stubs = {}
+
+        function stubs.help(msg) end
+        function stubs.whatis(msg) end
+        function stubs.prepend_path(var, value) end
+        function stubs.append_path(var, value) end
+        function stubs.unsetenv(var) end
+        function stubs.load(module) end
+        function stubs.unload(module) end
+        function stubs.conflict(module) end
+        function stubs.family(module) end
+        function stubs.add_property(var, value) end
+        function stubs.remove_property(var) end
+        function stubs.isloaded(module) return false end
+        function stubs.pathJoin(...) return table.concat({...}, "/") end
+
+        function run_module(content, chunkname)
+            local env_vars = {}
+            local env = {env_vars = env_vars}
+            env.setenv = function(var, value) env_vars[var] = value end
+
+            -- Resolve stubs first, then the standard library; any other global becomes a no-op function
+            setmetatable(env, {
+                __index = function(t, key)
+                    local value = stubs[key]
+                    if value == nil then value = _G[key] end
+                    if value == nil then value = function(...) end end
+                    rawset(t, key, value)
+                    return value
+                end
+            })
+
+            local chunk, err = chunk_load(content, chunkname, "t", env)
+            if not chunk then error(err, 0) end
+            chunk()
+            return env_vars
+        end
         ''')
 
         assert isinstance(lua, LuaRuntime), "Expected lua to be an instance of LuaRuntime"
@@ -177,67 +358,78 @@ def setup_lua_runtime() -> LuaRuntime:
         return None
 
 
+def get_lua_runtime() -> LuaRuntime:
+    """Returns the LuaRuntime for this process, creating it on first use."""
+    global _lua_runtime
+    if _lua_runtime is None:
+        _lua_runtime = setup_lua_runtime()
+    return _lua_runtime
+
+
 def execute_lua(lua, lua_content, lua_file_path):
     """
-    Executes Lua content and logs errors if execution fails.
+    Executes Lua content in a fresh environment and logs errors if execution fails.
 
     Args:
-        lua (LuaRuntime): An instance of LuaRuntime.
+        lua (LuaRuntime): An instance of LuaRuntime created by setup_lua_runtime.
         lua_content (str): The Lua code to execute.
         lua_file_path (str): The path of the Lua file being processed (for logging purposes).
 
     Returns:
-        bool: True if execution succeeds, None if it fails.
+        Lua table: The variables set with setenv if execution succeeds, None if it fails.
     """
     try:
-        lua.execute(lua_content)
-        return True
+        return lua.globals().run_module(lua_content, f"@{lua_file_path}")
     except Exception as e:
-        log_message = f"Error executing Lua content in {lua_file_path}: {e}\n"
-        print(log_message.strip())
-        utils.append_file(config.log_file_path, log_message)
+        log_message = f"Error executing Lua content in {lua_file_path}: {e}"
+        print(log_message)
+        utils.append_log(log_message, config.log_file_path, level=logging.WARNING)
         return None
 
 
 def extract_patterns(lua_content):
-    """Extracts data using regex patterns from Lua content."""
-    patterns = {
-        "help_info": re.compile(r'help\(\[\=\=\[(.*?)\]\=\=\]\)', re.DOTALL),
-        "whatis_info": re.compile(r'whatis\(\[\=\=\[(.*?)\]\=\=\]\)', re.DOTALL),
-        "loaded_modules": re.compile(r'load\("(.*?)"\)'),
-        "env_vars": re.compile(r'setenv\("([^"]+)",\s*"([^"]+)"\)'),
-        "root": re.compile(r'local root = "(.*?)"')
-    }
-    extracted_data = {key: pattern.findall(lua_content) for key, pattern in patterns.items()}
+    """Extracts data using the precompiled _MODULE_FILE_PATTERNS from Lua content."""
+    extracted_data = {key: pattern.findall(lua_content) for key, pattern in _MODULE_FILE_PATTERNS.items()}
     extracted_data["root"] = extracted_data["root"][0] if extracted_data["root"] else None
     return extracted_data
 
 
 def process_env_vars(env_vars, lua_globals):
     """Processes environment variables from Lua and merges them with Lua globals."""
-    env_vars_dict = {key: lua_globals[key] for key in lua_globals.keys()}
-    for var, value in env_vars:
-        env_vars_dict[var] = value
+    env_vars_dict = dict(lua_globals.items())
+    env_vars_dict.update(env_vars)
     return env_vars_dict
 
 
+def extract_package_suffix(lua_content, env_vars_dict):
+    """
+    Returns the package suffix of the EB* variables, e.g. 'GCC' for EBROOTGCC.
+
+    Handles multiple EBROOT* vars by prioritising direct 'root' assignments, falling back to the first available one.
+    Only the lines around ``setenv("EBROOT`` occurrences are inspected, rather than every line of the file.
+    """
+    position = lua_content.find(_EBROOT_SETENV)
+    while position != -1:
+        line_start = lua_content.rfind("\n", 0, position) + 1
+        line_end = lua_content.find("\n", position)
+        if line_end == -1:
+            line_end = len(lua_content)
+        line = lua_content[line_start:line_end]
+        if "root" in line and "pathJoin" not in line:
+            return line.split(_EBROOT_SETENV)[-1].split('"')[0]
+        position = lua_content.find(_EBROOT_SETENV, line_end)
+
+    return next(
+        (key.split('EBROOT')[-1] for key in sorted(env_vars_dict) if key.startswith('EBROOT')),
+        ''
+    )
+
+
 def extract_module_info(lua_content, lua_globals):
     """Extracts and organises module information from Lua content."""
     data = extract_patterns(lua_content)
     env_vars_dict = process_env_vars(data["env_vars"], lua_globals)
-    
-    # Handle multiple EBROOT* vars by prioritising direct 'root' assignments, falling back to the first available one.
-    def extract_package_suffix():
-        for line in lua_content.splitlines():
-            if "setenv(\"EBROOT" in line and "root" in line and "pathJoin" not in line:
-                return line.split("setenv(\"EBROOT")[-1].split('"')[0]  
-        
-        return next(
-            (key.split('EBROOT')[-1] for key in sorted(env_vars_dict) if key.startswith('EBROOT')),
-            ''
-        )
-
-    package_suffix = extract_package_suffix()
+    package_suffix = extract_package_suffix(lua_content, env_vars_dict)
 
     eb_vars = {
         k.replace(package_suffix, ''): {
@@ -256,99 +448,472 @@ def extract_module_info(lua_content, lua_globals):
     }
 
 
-def log_module_info(module_info):
-    """Logs module information to the configured log file."""
-    utils.append_log(f"\nParsed: {config.log_file_path}", config.log_file_path)
+def log_module_info(module_info, lua_file_path):
+    """Logs module information to the configured log file, when verbose logging is enabled."""
+    if not utils.debug_enabled(config.log_file_path):
+        return
+
+    def log(message):
+        utils.append_log(message, config.log_file_path, level=logging.DEBUG)
+
+    log(f"\nParsed: {lua_file_path}")
     for key, value in module_info.items():
-        utils.append_log(f"\n{key}:", config.log_file_path)
+        log(f"\n{key}:")
         if isinstance(value, list):
             for item in value:
-                utils.append_log(item, config.log_file_path)
+                log(item)
         elif isinstance(value, dict):
             for var, val in value.items():
-                utils.append_log(f"{var} = {val['value']} (variable: {val['var_name']})", config.log_file_path)
+                log(f"{var} = {val['value']} (variable: {val['var_name']})")
         else:
-            utils.append_log(value, config.log_file_path)
+            log(value)
 
 
-def extract_lua_info(lua_file_path):
-    """Extracts and returns module information from a Lua file."""
-    lua_content = read_lua_file(lua_file_path)
+def parse_lua_file(lua_file_path):
+    """Reads and executes a Lua file and returns its module information, or None if it could not be parsed."""
+    return parse_lua_file_timed(lua_file_path)[0]
+
+
+def parse_lua_file_timed(lua_file_path):
+    """
+    Parses a Lua file like parse_lua_file, also reporting how it was parsed.
+
+    Returns:
+        tuple: (module_info, mode, seconds) where mode is 'lua', or None if the file could not be read.
+    """
+    start = time.perf_counter()
+    module_info, mode = parse_lua_content(lua_file_path)
+    seconds = time.perf_counter() - start
+    tracing.record("parse module file", "module file", start, seconds, path=lua_file_path, mode=mode)
+    return module_info, mode, seconds
+
+
+def parse_lua_content(lua_file_path):
+    """Reads and executes a Lua file, see parse_lua_file_timed; returns (module_info, mode)."""
+    with tracing.span("read", "parse"):
+        lua_content = read_lua_file(lua_file_path)
     if not lua_content:
-        return None, None, None
+        return None, None
+
+    with tracing.span("execute_lua", "parse"):
+        env_vars = execute_lua(get_lua_runtime(), lua_content, lua_file_path)
+    if env_vars is None:
+        return None, "lua"
 
-    lua = setup_lua_runtime()
-    if not execute_lua(lua, lua_content, lua_file_path):
+    with tracing.span("extract_module_info", "parse"):
+        module_info = extract_module_info(lua_content, env_vars)
+    log_module_info(module_info, lua_file_path)
+    return module_info, "lua"
+
+
+def format_creation_date(ctime):
+    return datetime.datetime.fromtimestamp(ctime).strftime('%Y-%m-%d')
+
+
+def extract_lua_info(lua_file_path):
+    """Extracts and returns module information from a Lua file."""
+    module_info = parse_lua_file(lua_file_path)
+    if module_info is None:
         return None, None, None
 
-    module_info = extract_module_info(lua_content, lua.globals().env_vars)
-    log_module_info(module_info)
-    creation_date = datetime.datetime.fromtimestamp(os.path.getctime(lua_file_path)).strftime('%Y-%m-%d')
-    installer = extract_installer(lua_file_path)
+    creation_date = format_creation_date(stat_lua_file(lua_file_path).st_ctime)
+    installer = extract_installer(lua_file_path, stat_lua_file)
     return module_info, creation_date, installer
 
 
-def gather_lua_paths_by_arch():
-    """Gathers Lua file paths organized by architecture."""
-    paths_by_arch = {arch: mp.replace('/all', '').split(':') for arch, mp in config.modulepaths.items()}
-    extracted_paths_by_arch = {
-        arch: [
-            (file, '/'.join(file.split('/')[-3:]).replace('.lua', ''))
-            for path in paths
-            for file in glob.glob(os.path.join(path, '*/*/*.lua'))
-        ]
-        for arch, paths in paths_by_arch.items()
+def scan_directory(path, directories_only=False):
+    """
+    Lists the entries of a directory the way glob's ``*`` does: hidden entries are skipped and
+    unreadable directories are treated as empty.
+
+    Args:
+        path (str): The directory to list.
+        directories_only (bool): Only return entries that are directories, or symlinks to directories.
+
+    Returns:
+        list: os.DirEntry objects, in the order the filesystem returns them.
+    """
+    try:
+        with os.scandir(path) as entries:
+            return [entry for entry in entries
+                    if not entry.name.startswith('.') and (not directories_only or entry.is_dir())]
+    except OSError:
+        return []
+
+
+def file_stamp(entry):
+    """
+    (mtime in ns, size) of a module file for fingerprint_lua_files, or (-1, -1) for a broken symlink.
+    The stat result is cached by the os.DirEntry, so stat_lua_file reuses it.
+    """
+    try:
+        st = entry.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return -1, -1
+
+
+def scan_modulepath(modulepath, results):
+    """
+    Walks a modulepath like glob('*/*/*.lua') and puts each package directory's module files on a queue as it goes.
+
+    Puts (modulepath, package_files) for each package directory, where package_files lists
+    (lua_file_path, 'category/package/version', os.DirEntry, file_stamp) tuples, then (modulepath, None) when done.
+    Each file is stamped as it is scanned, so the fingerprint of the collected data describes the files as they
+    were before parsing.
+
+    Args:
+        modulepath (str): The modulepath to walk.
+        results (queue.Queue): Queue receiving the package directories.
+    """
+    try:
+        with tracing.span("scan modulepath", "scan", modulepath=modulepath):
+            for category in scan_directory(modulepath, directories_only=True):
+                for package in scan_directory(category.path, directories_only=True):
+                    package_files = [
+                        (entry.path, f"{category.name}/{package.name}/{entry.name}".replace('.lua', ''), entry,
+                         file_stamp(entry))
+                        for entry in scan_directory(package.path) if entry.name.endswith('.lua')
+                    ]
+                    if package_files:
+                        results.put((modulepath, package_files))
+    finally:
+        results.put((modulepath, None))
+
+
+def gather_lua_paths_by_arch(threads=1, prefetch=None):
+    """
+    Gathers Lua file paths organized by architecture.
+
+    Each distinct modulepath is walked once, even when several architectures share it, by up to
+    ``threads`` scanner threads. Package directories are handed over as soon as they are scanned, so
+    ``prefetch`` can start parsing module files while the metadata crawl is still running.
+
+    Args:
+        threads (int): Number of modulepaths scanned concurrently.
+        prefetch (callable, optional): Called with batches of Lua file paths worth parsing early: the
+            first version, in sort order, of each package directory scanned so far.
+
+    Returns:
+        dict: Maps each architecture to its (lua_file_path, 'category/package/version') tuples.
+    """
+    global _dir_entries, _file_stamps
+    _dir_entries = {}
+    _file_stamps = {}
+    modulepaths_by_arch = {arch: mp.replace('/all', '').split(':') for arch, mp in config.modulepaths.items()}
+    modulepaths = get_modulepaths()
+
+    scanned = {modulepath: [] for modulepath in modulepaths}
+    results = queue.Queue()
+    candidates = []
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as scanners:
+        for modulepath in modulepaths:
+            scanners.submit(scan_modulepath, modulepath, results)
+
+        remaining = len(modulepaths)
+        while remaining:
+            modulepath, package_files = results.get()
+            if package_files is None:
+                remaining -= 1
+                continue
+
+            for lua_file_path, extracted_path, entry, stamp in package_files:
+                scanned[modulepath].append((lua_file_path, extracted_path))
+                _dir_entries[lua_file_path] = entry
+                _file_stamps[lua_file_path] = stamp
+            if prefetch is not None:
+                candidates.append(min(package_files, key=lambda package_file: version_sort_key(package_file[1]))[0])
+                if len(candidates) >= _PREFETCH_BATCH_SIZE:
+                    prefetch(candidates)
+                    candidates = []
+
+    return {
+        arch: [lua_path for modulepath in paths for lua_path in scanned[modulepath]]
+        for arch, paths in modulepaths_by_arch.items()
     }
-    return extracted_paths_by_arch
-
-
-def sort_paths(paths_by_arch):
-    """Sorts Lua file paths for each architecture."""
-    sorted_paths_by_arch = {
-        arch: sorted(
-            paths,
-            key=lambda path: (
-                path[1].split('/')[0].casefold(),
-                path[1].split('/')[1].casefold(),
-                [
-                    (-int(x) if x.isdigit() else x.casefold())
-                    for x in re.split('(\d+)', path[1].split('/')[2])
-                ]
-            )
-        )
-        for arch, paths in paths_by_arch.items()
+
+
+def stat_lua_file(lua_file_path, follow_symlinks=True):
+    """Returns the stat result of a Lua file, reusing the one cached by the modulepath scan when there is one."""
+    entry = _dir_entries.get(lua_file_path)
+    if entry is None:
+        return os.stat(lua_file_path, follow_symlinks=follow_symlinks)
+    return entry.stat(follow_symlinks=follow_symlinks)
+
+
+def get_modulepaths():
+    """Returns each distinct modulepath of every architecture, in order of first appearance."""
+    modulepaths_by_arch = {arch: mp.replace('/all', '').split(':') for arch, mp in config.modulepaths.items()}
+    return list(dict.fromkeys(path for paths in modulepaths_by_arch.values() for path in paths))
+
+
+def fingerprint_lua_files(lua_files):
+    """
+    Summarises a modulepath's module files so that adding, removing or modifying any of them changes the result.
+
+    Args:
+        lua_files (list): (lua_file_path, file_stamp) tuples of the module files found in the modulepath.
+
+    Returns:
+        dict: Numbers of 'packages' (package directories) and 'files', the newest file 'mtime' (ns), and
+            a 'digest' of every file's path, mtime and size.
+    """
+    digest = hashlib.sha256()
+    newest = 0
+    # Broken symlinks count by their path alone, see file_stamp
+    for lua_file_path, (mtime, size) in sorted(lua_files, key=lambda lua_file: lua_file[0]):
+        newest = max(newest, mtime)
+        digest.update(f"{lua_file_path}\0{mtime}\0{size}\n".encode())
+    return {
+        'packages': len({os.path.dirname(lua_file_path) for lua_file_path, _ in lua_files}),
+        'files': len(lua_files),
+        'mtime': newest,
+        'digest': digest.hexdigest(),
     }
-    return sorted_paths_by_arch
 
 
-def process_paths_for_architecture(paths, arch, parser_module, latest_version_info, package_infos):
+def fingerprint_modulepath(modulepath):
+    """Walks a modulepath like scan_modulepath and returns the fingerprint_lua_files of its module files."""
+    return fingerprint_lua_files([
+        (entry.path, file_stamp(entry))
+        for category in scan_directory(modulepath, directories_only=True)
+        for package in scan_directory(category.path, directories_only=True)
+        for entry in scan_directory(package.path) if entry.name.endswith('.lua')
+    ])
+
+
+def fingerprint_modulepaths(threads=1, scanned=False):
+    """
+    Fingerprints every modulepath, see fingerprint_lua_files, to tell later whether collected data is stale.
+
+    Args:
+        threads (int): Number of modulepaths walked concurrently.
+        scanned (bool): Use the module files found by the last gather_lua_paths_by_arch, as they were when
+            scanned, instead of walking the modulepaths again.
+
+    Returns:
+        dict: Maps each modulepath to its fingerprint.
+    """
+    modulepaths = get_modulepaths()
+    if scanned:
+        lua_files = {os.path.normpath(modulepath): [] for modulepath in modulepaths}
+        for lua_file_path, stamp in _file_stamps.items():
+            # Module files are always <modulepath>/<category>/<package>/<version>.lua
+            modulepath = os.path.dirname(os.path.dirname(os.path.dirname(lua_file_path)))
+            lua_files[os.path.normpath(modulepath)].append((lua_file_path, stamp))
+        return {modulepath: fingerprint_lua_files(lua_files[os.path.normpath(modulepath)])
+                for modulepath in modulepaths}
+
+    with ThreadPoolExecutor(max_workers=max(threads, 1)) as walkers:
+        return dict(zip(modulepaths, walkers.map(fingerprint_modulepath, modulepaths)))
+
+
+def check_collected_data(threads=1):
+    """
+    Tells whether the collected data file is up to date with the modulepaths, without parsing any module file.
+
+    Args:
+        threads (int): Number of modulepaths walked concurrently.
+
+    Returns:
+        tuple: The state, 'missing' (no collected data), 'stale' (modulepaths changed since the data was
+            collected, or it has no fingerprints) or 'current', and the list of modulepaths which changed.
+    """
+    # Only the header with the fingerprints is needed, not the data
+    collected_data = utils.load_collected_data(config.DATA_FILE, header_only=True)
+    if not collected_data:
+        return 'missing', []
+
+    stored = collected_data.get('fingerprints', {})
+    changed = [modulepath for modulepath, fingerprint in fingerprint_modulepaths(threads).items()
+               if stored.get(modulepath) != fingerprint]
+    return ('stale' if changed else 'current'), changed
+
+
+def version_sort_key(extracted_path):
+    """
+    Sort key of a 'category/package/version' path: by category and package, then newest version first.
+
+    Versions compare naturally, so digit runs count as numbers: 12.2.0 sorts before 12.10.0 and
+    is newer, and GCCcore-11.3.0 before GCCcore-9.3.0.
+    """
+    category, package, version = extracted_path.split('/')
+    return (
+        category.casefold(),
+        package.casefold(),
+        tuple((-int(x) if x.isdigit() else x.casefold()) for x in _VERSION_PARTS.split(version))
+    )
+
+
+def group_paths(paths):
+    """
+    Groups Lua file paths by (category, package), computing each path's sort key once.
+
+    Args:
+        paths (list): (lua_file_path, 'category/package/version') tuples, in the order they were found.
+
+    Returns:
+        dict: Maps each (category, package) to its (lua_file_path, version) tuples, newest version first.
+            Groups are ordered by category and package; paths with equal versions keep the order they were found in.
+    """
+    keyed_groups = {}
+    for lua_file_path, extracted_path in paths:
+        category, package, version = extracted_path.split('/')
+        keyed_groups.setdefault((category.capitalize(), package), []).append(
+            (version_sort_key(extracted_path), lua_file_path, version))
+
+    groups = {}
+    for keyed_versions in keyed_groups.values():
+        keyed_versions.sort(key=lambda keyed_version: keyed_version[0])
+    for group, keyed_versions in sorted(keyed_groups.items(), key=lambda item: item[1][0][0]):
+        groups[group] = [(lua_file_path, version) for _, lua_file_path, version in keyed_versions]
+    return groups
+
+
+def extract_lua_infos(lua_file_paths, parser_module, executor=None, parse_cache=None):
+    """
+    Extracts module information from several Lua files, fanning the work out over
+    a process pool when an executor is given.
+
+    Each physical file is read and executed at most once: paths already handled this run are
+    not touched again, paths resolving to the same file (such as the ``all/`` module and its
+    category symlink) share a single parse, and files whose signature matches the results
+    stored by a previous run are not parsed at all.
+
+    Args:
+        lua_file_paths (list): Paths of the Lua files to parse.
+        parser_module (module): The parser module used to parse Lua files.
+        executor (concurrent.futures.Executor, optional): Pool to run parse_lua_file in.
+        parse_cache (dict, optional): Parse cache for the run, see common.new_parse_cache; updated in place.
+
+    Returns:
+        dict: Maps each Lua file path to its (module_info, creation_date, installer) tuple.
+    """
+    parse_cache = new_parse_cache() if parse_cache is None else parse_cache
+    lua_infos = parse_cache['lua_infos']
+    module_infos = parse_cache['module_infos']
+
+    file_stats = {}
+    files_to_parse = {}
+    for lua_file_path in lua_file_paths:
+        if lua_file_path in lua_infos:
+            continue
+        try:
+            stat = stat_lua_file(lua_file_path)
+            file_id = (stat.st_dev, stat.st_ino)
+        except OSError:
+            # Leave missing files to parse_lua_file, which records them as broken symlinks
+            stat, file_id = None, lua_file_path
+        file_stats[lua_file_path] = (stat, file_id)
+
+        stored = parse_cache['stored'].get(lua_file_path)
+        if stat and stored and stored[0] == file_signature(stat):
+            module_infos[file_id] = stored[1]
+            parse_cache['hits'] += 1
+        else:
+            parse_cache['misses'] += 1
+            if file_id not in module_infos:
+                files_to_parse.setdefault(file_id, lua_file_path)
+
+    parse_cache['opened'] += len(files_to_parse)
+    parse = parser_module.parse_lua_file_timed
+    if executor is None:
+        parsed = tracing.map_traced(map, parse, files_to_parse.values())
+    else:
+        parsed = tracing.map_traced(executor.map, parse, files_to_parse.values(), chunksize=16)
+    for file_id, (module_info, mode, seconds) in zip(files_to_parse, parsed):
+        module_infos[file_id] = module_info
+        if mode is not None:
+            mode_stats = parse_cache['modes'].setdefault(mode, [0, 0.0])
+            mode_stats[0] += 1
+            mode_stats[1] += seconds
+
+    for lua_file_path, (stat, file_id) in file_stats.items():
+        module_info = module_infos[file_id]
+        if module_info is None:
+            lua_infos[lua_file_path] = (None, None, None)
+        else:
+            with tracing.span("extract_installer", "parse"):
+                installer = extract_installer(lua_file_path, stat_lua_file)
+            lua_infos[lua_file_path] = (module_info, format_creation_date(stat.st_ctime), installer)
+            parse_cache['files'][lua_file_path] = (file_signature(stat), module_info)
+
+    return {lua_file_path: lua_infos[lua_file_path] for lua_file_path in lua_file_paths}
+
+
+def select_latest_lua_infos(groups, arch, parser_module, latest_version_info, executor=None, parse_cache=None):
+    """
+    Parses the Lua files needed to pick the latest version of each package for an architecture.
+
+    The first version of each (category, package) in sort order wins; the next version is only
+    parsed if every earlier one failed. Files are parsed in rounds so each round can be spread
+    over the executor, while the outcome stays identical to a serial walk of the paths.
+
+    Args:
+        groups (dict): Lua file paths grouped by (category, package), see group_paths.
+
+    Returns:
+        dict: Maps each parsed Lua file path to its (module_info, creation_date, installer) tuple.
+    """
+    lua_infos = {}
+    pending = [versions for group, versions in groups.items() if arch not in latest_version_info.get(group, {})]
+    depth = 0
+    while pending:
+        lua_infos.update(extract_lua_infos([versions[depth][0] for versions in pending], parser_module, executor,
+                                           parse_cache))
+        pending = [versions for versions in pending
+                   if lua_infos[versions[depth][0]][0] is None and len(versions) > depth + 1]
+        depth += 1
+    return lua_infos
+
+
+def process_paths_for_architecture(paths, arch, parser_module, latest_version_info, package_infos, executor=None,
+                                   parse_cache=None, version_infos=None):
     """
     Processes Lua paths for a given architecture, extracting module information
     and updating the latest version and package information dictionaries.
 
+    Only the newest version of each package is parsed; older versions are parsed only while
+    every newer one failed, and versions that failed are left out of package_infos. Other versions
+    are recorded from the directory listing alone, unless version_infos is given.
+
     Args:
         paths (list): List of (lua_file_path, extracted_path) tuples for the architecture.
         arch (str): The architecture name (e.g., 'znver3', 'icelake').
         parser_module (module): The parser module used to extract Lua information.
         latest_version_info (dict): Dictionary to store the latest version info by category and package.
         package_infos (dict): Dictionary to store package information by architecture.
+        executor (concurrent.futures.Executor, optional): Process pool used to parse Lua files in parallel.
+        parse_cache (dict, optional): Parse cache shared between architectures, so files on modulepaths
+            common to several architectures are only parsed once, see common.new_parse_cache.
+        version_infos (dict, optional): If given, every version is parsed and its (module_info, creation_date,
+            installer) tuple stored here by architecture and (category, package, version).
     """
-    for lua_file_path, extracted_path in paths:
-        category, package, version = extracted_path.split('/')
-        category = category.capitalize()
-
-        # Initialize latest_version_info entry if not present
-        if (category, package) not in latest_version_info:
-            latest_version_info[(category, package)] = {}
-
-        # Extract module information if not already processed for this architecture
-        if arch not in latest_version_info[(category, package)]:
-            module_info, creation_date, installer = parser_module.extract_lua_info(lua_file_path)
-            if module_info is None:
-                continue  # Skip if information could not be extracted
-
-            latest_version_info[(category, package)][arch] = (module_info, creation_date, installer)
-
-        # Update package information if this version is not yet recorded
-        if (category, package, version) not in package_infos[arch]:
-            package_infos[arch][(category, package, version)] = (lua_file_path, version)
+    groups = group_paths(paths)
+    lua_infos = select_latest_lua_infos(groups, arch, parser_module, latest_version_info, executor, parse_cache)
+
+    failed = set()
+    for group, versions in groups.items():
+        latest = latest_version_info.setdefault(group, {})
+        if arch in latest:
+            continue
+        for lua_file_path, version in versions:
+            if lua_infos[lua_file_path][0] is not None:
+                latest[arch] = lua_infos[lua_file_path]
+                break
+            failed.add(lua_file_path)
+
+    # Record each version once, keeping the first path found for it
+    arch_infos = package_infos[arch]
+    for (category, package), versions in groups.items():
+        for lua_file_path, version in versions:
+            if lua_file_path not in failed:
+                arch_infos.setdefault((category, package, version), (lua_file_path, version))
+
+    if version_infos is not None:
+        lua_infos.update(extract_lua_infos([lua_file_path for lua_file_path, _ in arch_infos.values()], parser_module,
+                                           executor, parse_cache))
+        arch_version_infos = version_infos.setdefault(arch, {})
+        for key, (lua_file_path, version) in arch_infos.items():
+            if lua_infos[lua_file_path][0] is not None:
+                arch_version_infos[key] = lua_infos[lua_file_path]
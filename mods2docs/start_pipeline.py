@@ -1,32 +1,76 @@
+import inspect
 import logging
 import argparse
 import importlib
-from mods2docs import config, utils
+from mods2docs import config, utils, collect_data, tracing
 
 
-def execute_pipeline(writer_module, parser_module):
+def execute_pipeline(writer_module, parser_module, collected_data=None, render_workers=1, write_threads=1):
     logging.info("Starting process")
     utils.write_log(config.main_log_file)
     writer_module.setup_writer_directories()
 
-    for title, output_dir in zip(config.titles, config.output_dirs):
-        logging.info(f"Processing {title} in directory {output_dir}")
+    # Data collected in this process is used as is, rather than read back from the data file
+    if collected_data is not None:
+        with tracing.span("load package data"):
+            parser_module.load_package_data(collected_data)
 
-        # Use the selected parser module to process data
-        package_infos, latest_version_info, package_ref = parser_module.process_modulepath(config.modulepaths, title,
-                                                                                           output_dir)
+    logging.info(f"Peak memory before processing: {utils.peak_memory_mb():.1f} MB")
 
-        # Use the selected writer module to write files
-        writer_module.write_all_files(title, output_dir, package_infos, package_ref, latest_version_info)
+    # Output is rendered in memory and only files whose content changed are written to disk
+    writer_name = writer_module.__name__.rsplit('.', 1)[-1]
+    manifest_file = config.DATA_DIR / f"output-manifest-{writer_name}.json"
+    # Only writers which render in parallel take the process pool
+    parallel_writer = "executor" in inspect.signature(writer_module.write_all_files).parameters
+    with utils.process_pool(render_workers if parallel_writer else 1) as executor, \
+            utils.staged_output(manifest_file, write_threads, writer_module.generated_directories()) as counts:
+        for title, output_dir in zip(config.titles, config.output_dirs):
+            logging.info(f"Processing {title} in directory {output_dir}")
 
-    # Write global files that are needed only once
-    writer_module.write_global_files(config)
+            # Use the selected parser module to process data
+            with tracing.span("process_modulepath", title=title):
+                package_infos, latest_version_info, package_ref = parser_module.process_modulepath(
+                    config.modulepaths, title, output_dir)
+
+            # Use the selected writer module to write files
+            with tracing.span("write_all_files", title=title):
+                writer_arguments = {"executor": executor} if parallel_writer else {}
+                writer_module.write_all_files(title, output_dir, package_infos, package_ref, latest_version_info,
+                                              **writer_arguments)
+
+        # Write global files that are needed only once
+        with tracing.span("write_global_files"):
+            writer_module.write_global_files(config)
+
+    message = f"Output files: {counts['written']} written, {counts['unchanged']} unchanged, {counts['deleted']} deleted"
+    logging.info(message)
+    utils.append_log(message, config.main_log_file)
+
+    with tracing.span("wait for background saves"):
+        utils.wait_for_background_saves()
+    message = f"Peak memory after processing: {utils.peak_memory_mb():.1f} MB"
+    logging.info(message)
+    utils.append_log(message, config.main_log_file)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Choose writer and parser modules")
     parser.add_argument("-v", "--verbose", action="store_true", help="increase output verbosity")
     parser.add_argument("--writer", required=True, help="Choose the writer module to use")
     parser.add_argument("--parser", required=True, help="Choose the parser module to use")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="Number of processes used to render package files (default: 1, serial)")
+    parser.add_argument("--write-threads", type=int, default=1,
+                        help="Number of output files compared and written concurrently (default: 1)")
+    collect_options = parser.add_argument_group("collection options")
+    collect_options.add_argument("--collect", action="store_true",
+                                 help="Collect data in this process first, instead of reading the collected data file")
+    collect_options.add_argument("--refresh-stale", action="store_true",
+                                 help="Collect data in this process first if the modulepaths changed since it was "
+                                      "collected (only changed module files are parsed again)")
+    collect_options.add_argument("--save-in-background", action="store_true",
+                                 help="With --collect, write the collected data file while output is rendered")
+    collect_data.add_collect_arguments(collect_options)
+    collect_data.add_profile_arguments(parser)
     args = parser.parse_args()
 
     # Set up logging based on verbosity
@@ -36,4 +80,21 @@ if __name__ == "__main__":
     writer_module = utils.load_module("writer", args.writer)
     parser_module = utils.load_module("parser", args.parser)
 
-    execute_pipeline(writer_module, parser_module)
+    if args.profile:
+        tracing.start()
+
+    if args.refresh_stale and not args.collect:
+        state, changed = parser_module.check_collected_data(args.scan_threads)
+        logging.info(f"Collected data is {state}" + (f", modulepaths changed: {', '.join(changed)}" if changed else ""))
+        args.collect = state != 'current'
+
+    collected_data = None
+    if args.collect:
+        collected_data = collect_data.main(parser_module, args.workers, args.full, args.scan_threads,
+                                           args.parse_all_versions, args.save_in_background)
+
+    execute_pipeline(writer_module, parser_module, collected_data, args.render_workers, args.write_threads)
+
+    if args.profile:
+        collect_data.write_profile(config.DATA_DIR / "profile-start-pipeline.json", args.profile_top,
+                                   config.main_log_file)
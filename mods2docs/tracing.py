@@ -0,0 +1,163 @@
+"""
+Timed spans for ``--profile`` runs of collect_data and start_pipeline.
+
+Spans are recorded only once start() has been called; otherwise span() returns a shared no-op context
+manager, so instrumented code costs a function call. Spans recorded in worker processes are sent back with
+the results of map(), as time.perf_counter is the same clock in every process.
+
+The trace is written in the Trace Event Format, which chrome://tracing and https://ui.perfetto.dev load,
+and summarised as the time spent in each span name and the slowest module files.
+"""
+import os
+import json
+import time
+import threading
+import contextlib
+import functools
+
+# Spans recorded in this process as (name, category, start, duration, pid, tid, args), or None if not tracing
+_spans = None
+_start = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ('name', 'category', 'args', 'start')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _spans.append((self.name, self.category, self.start, time.perf_counter() - self.start, os.getpid(),
+                       threading.get_ident(), self.args))
+        return False
+
+
+def start():
+    """Starts recording spans in this process, discarding any recorded before."""
+    global _spans, _start
+    _spans = []
+    _start = time.perf_counter()
+
+
+def enabled():
+    """Whether spans are being recorded."""
+    return _spans is not None
+
+
+def span(name, category="stage", **args):
+    """
+    Returns a context manager recording the time spent in its body, if tracing.
+
+    Args:
+        name (str): What is timed, e.g. 'scan modulepaths' or 'execute_lua'.
+        category (str): 'stage' for the steps of a run, 'module file' for the parsing of one module file
+            and 'parse' for the steps of that.
+        **args: Details shown with the span, e.g. the path of the module file.
+    """
+    if _spans is None:
+        return _NO_SPAN
+    return _Span(name, category, args)
+
+
+def record(name, category, start, duration, **args):
+    """Records a span timed by the caller, e.g. where the details are only known at its end; see span."""
+    if _spans is not None:
+        _spans.append((name, category, start, duration, os.getpid(), threading.get_ident(), args))
+
+
+def _call_traced(function, item):
+    # Records the spans of one call apart from any others in this process, so they can be returned with its result
+    global _spans
+    outer_spans, _spans = _spans, []
+    try:
+        return function(item), _spans
+    finally:
+        _spans = outer_spans
+
+
+def _merge_spans(traced_results):
+    for result, spans in traced_results:
+        _spans.extend(spans)
+        yield result
+
+
+def map_traced(map_function, function, iterable, **kwargs):
+    """
+    Calls map_function(function, iterable, **kwargs), such as Executor.map or the built-in map, and collects
+    the spans function records, including in worker processes, when tracing. function must be picklable.
+    """
+    if _spans is None:
+        return map_function(function, iterable, **kwargs)
+    return _merge_spans(map_function(functools.partial(_call_traced, function), iterable, **kwargs))
+
+
+def summarise(spans, top=20):
+    """
+    Summarises spans as the total time and count of each (category, name) and the slowest module files.
+
+    Returns:
+        dict: 'spans', a list of {category, name, count, seconds} by descending time, and 'slowest_module_files',
+            a list of {path, mode, seconds} of at most ``top`` module files.
+    """
+    totals = {}
+    module_files = []
+    for name, category, _, duration, _, _, args in spans:
+        total = totals.setdefault((category, name), [0, 0.0])
+        total[0] += 1
+        total[1] += duration
+        if category == "module file":
+            module_files.append((duration, args.get('path', name), args.get('mode')))
+    module_files.sort(key=lambda module_file: module_file[0], reverse=True)
+    return {
+        'spans': [{'category': category, 'name': name, 'count': count, 'seconds': round(seconds, 6)}
+                  for (category, name), (count, seconds) in sorted(totals.items(), key=lambda item: -item[1][1])],
+        'slowest_module_files': [{'path': path, 'mode': mode, 'seconds': round(duration, 6)}
+                                 for duration, path, mode in module_files[:top]],
+    }
+
+
+def format_summary(summary):
+    """Formats a summary from summarise as lines of text."""
+    lines = ["Time per stage:"]
+    for total in summary['spans']:
+        if total['category'] != "module file":
+            lines.append(f"  {total['seconds']:10.3f}s  {total['count']:8}  {total['category']}: {total['name']}")
+    if summary['slowest_module_files']:
+        lines.append("Slowest module files:")
+        for module_file in summary['slowest_module_files']:
+            lines.append(f"  {module_file['seconds'] * 1000:10.2f}ms  {module_file['mode'] or '-':8}  "
+                         f"{module_file['path']}")
+    return lines
+
+
+def finish(trace_file, top=20):
+    """
+    Stops tracing and writes the spans recorded to trace_file, with their summary.
+
+    Args:
+        trace_file (str): Path of the trace, a JSON file in the Trace Event Format.
+        top (int): Number of slowest module files in the summary.
+
+    Returns:
+        list: The lines of the summary, see format_summary.
+    """
+    global _spans
+    spans, _spans = _spans, None
+    if spans is None:
+        return []
+
+    events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': round((start - _start) * 1e6, 1),
+               'dur': round(duration * 1e6, 1), 'pid': pid, 'tid': tid, 'args': args}
+              for name, category, start, duration, pid, tid, args in spans]
+    summary = summarise(spans, top)
+    with open(trace_file, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': summary}, file)
+
+    return format_summary(summary)
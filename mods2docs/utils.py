@@ -1,8 +1,78 @@
 import os
+import sys
+import json
+import time
+import signal
 import pickle
 import logging
+import resource
+import tempfile
 import importlib
-from mods2docs import config
+import threading
+import contextlib
+import multiprocessing
+import logging.handlers
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from mods2docs import config, data_format, tracing
+
+# Loggers for the log files in DATA_DIR (main log, collection log, broken symlinks) hang off this logger.
+# Its level decides whether verbose DEBUG records, such as per-module dumps, are written at all.
+file_loggers = logging.getLogger("mods2docs.files")
+file_loggers.setLevel(logging.INFO)
+file_loggers.propagate = False
+
+LOG_BUFFER_SIZE = 1024 * 1024
+# Buffered log records are written to disk at least this often, and at once for warnings, see BufferedFileHandler
+LOG_FLUSH_RECORDS = 1000
+LOG_FLUSH_SECONDS = 5.0
+# Set in worker processes, which send their records to the parent process instead of writing files
+_log_queue = None
+# Set while output is staged, see staged_output: maps each output path to the chunks written to it
+_staged_files = None
+# Threads saving collected data in the background, see save_collected_data_in_background
+_background_saves = []
+# The process umask, which output files are created with; reading it means setting it
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    A FileHandler which keeps its file open and buffers records, writing them to disk for every warning, every
+    LOG_FLUSH_RECORDS records and at least every LOG_FLUSH_SECONDS, so little is lost if the job is killed.
+    See also flush_logs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        logging.FileHandler.__init__(self, *args, **kwargs)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=LOG_BUFFER_SIZE, encoding=self.encoding)
+
+    def flush(self):
+        # Called by StreamHandler.emit for every record; emit decides when to flush instead
+        pass
+
+    def emit(self, record):
+        logging.FileHandler.emit(self, record)
+        self._unflushed += 1
+        if (record.levelno >= logging.WARNING or self._unflushed >= LOG_FLUSH_RECORDS
+                or time.monotonic() - self._last_flush >= LOG_FLUSH_SECONDS):
+            self.flush_buffer()
+
+    def flush_buffer(self):
+        logging.FileHandler.flush(self)
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+
+class LogDispatchHandler(logging.Handler):
+    """Writes records received from worker processes to the log file they were logged for."""
+
+    def emit(self, record):
+        get_file_logger(record.logfile).handle(record)
 
 def setup_logging(verbose, logfile=None):
     """
@@ -34,40 +104,303 @@ def setup_logging(verbose, logfile=None):
     # Attach only the console handler to the root logger
     logging.getLogger().addHandler(console_handler)
 
+    # Verbose output in the log files in DATA_DIR
+    file_loggers.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    # SLURM sends SIGTERM at the time limit: write the buffered log records before exiting
+    signal.signal(signal.SIGTERM, exit_on_signal)
+
+def exit_on_signal(signum, frame):
+    """Signal handler which writes buffered log records to disk, then exits with the shell's status for signum."""
+    flush_logs()
+    sys.exit(128 + signum)
+
 def make_filename(*args):
     return '-'.join(args).replace(' ', '-').lower()
 # Alias - to ease reading code
 make_reference = make_filename
 
 def write_file(filepath, content):
+    if _staged_files is not None:
+        _staged_files[os.path.normpath(filepath)] = [content]
+        return
     with open(filepath, 'w') as file:
         file.write(content)
 
 def append_file(filepath, content):  
+    if _staged_files is not None:
+        _staged_files.setdefault(os.path.normpath(filepath), []).append(content)
+        return
     with open(filepath, 'a') as file:
         file.write(content)
 
+def read_file(filepath):
+    """Reads an output file, as staged so far if output is being staged."""
+    if _staged_files is not None:
+        return ''.join(_staged_files.get(os.path.normpath(filepath), []))
+    with open(filepath, 'r') as file:
+        return file.read()
+
+def staged_content(filepath):
+    """The content staged so far for an output file, or None if it has not been staged (or output is not staged)."""
+    if _staged_files is None or os.path.normpath(filepath) not in _staged_files:
+        return None
+    return ''.join(_staged_files[os.path.normpath(filepath)])
+
+def file_exists(filepath):
+    """Whether an output file has been written (this run, if output is being staged)."""
+    if _staged_files is not None:
+        return os.path.normpath(filepath) in _staged_files
+    return os.path.exists(filepath)
+
+def list_files(directory):
+    """Lists the output files in a directory (written this run, if output is being staged)."""
+    if _staged_files is not None:
+        directory = os.path.normpath(directory)
+        return [os.path.basename(path) for path in _staged_files if os.path.dirname(path) == directory]
+    return os.listdir(directory)
+
+def _files_under(directories):
+    """Lists the paths of the files under directories, recursively."""
+    return [os.path.join(dirpath, filename)
+            for directory in directories
+            for dirpath, _, filenames in os.walk(os.path.normpath(directory))
+            for filename in filenames]
+
+def write_file_if_changed(filepath, content, make_dirs=True):
+    """
+    Writes content to filepath atomically, unless the file already holds exactly that content.
+
+    Args:
+        make_dirs (bool): Create the file's directory if needed; pass False if it is known to exist.
+
+    Returns:
+        bool: True if the file was written, False if it was unchanged.
+    """
+    try:
+        with open(filepath, 'r') as file:
+            if file.read() == content:
+                return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+
+    directory = os.path.dirname(filepath) or '.'
+    if make_dirs:
+        os.makedirs(directory, exist_ok=True)
+    # A unique temporary file in the same directory, so concurrent writers never share one and the rename is atomic
+    fd, temp_file = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filepath)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as file:
+            file.write(content)
+        # mkstemp creates the file readable by its owner only; give it the permissions open() would
+        os.chmod(temp_file, 0o666 & ~_umask)
+        os.replace(temp_file, filepath)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp_file)
+        raise
+    return True
+
+def render_output(function, *args):
+    """
+    Calls function with args, staging what it writes with write_file and append_file apart from any other
+    staged output, and returns the content of each file it wrote, by path. Nothing is written to disk.
+    """
+    global _staged_files
+    outer_staged_files, _staged_files = _staged_files, {}
+    try:
+        function(*args)
+        return {filepath: ''.join(chunks) for filepath, chunks in _staged_files.items()}
+    finally:
+        _staged_files = outer_staged_files
+
+@contextlib.contextmanager
+def staged_output(manifest_file, threads=1, generated_dirs=()):
+    """
+    Stages everything written with write_file and append_file in memory, then writes only the files
+    whose content changed, so unchanged outputs keep their mtimes for rsync and Sphinx.
+
+    Files listed in the manifest from the previous run but not written this run are deleted. Without a
+    manifest (first run, or a lost manifest) the files under generated_dirs are taken as the previous
+    run's output instead. Nothing is written if the body raises.
+
+    Args:
+        manifest_file (str): JSON file listing the files written by the previous run; replaced on success.
+        threads (int): Number of files compared and written concurrently, which hides the per-file
+            latency of network filesystems.
+        generated_dirs (iterable of str): Directories holding only generated output, used when there is
+            no manifest.
+
+    Yields:
+        dict: Counts of files 'written', 'unchanged' and 'deleted', filled in once output is committed.
+    """
+    global _staged_files
+    counts = {'written': 0, 'unchanged': 0, 'deleted': 0}
+    _staged_files = {}
+    try:
+        yield counts
+        staged_files, _staged_files = _staged_files, None
+
+        # Each directory is created once, rather than checked for every file written to it
+        for directory in {os.path.dirname(filepath) or '.' for filepath in staged_files}:
+            os.makedirs(directory, exist_ok=True)
+
+        def commit(staged_file):
+            filepath, chunks = staged_file
+            return write_file_if_changed(filepath, ''.join(chunks), make_dirs=False)
+
+        with tracing.span("commit output", files=len(staged_files)):
+            if threads > 1:
+                with ThreadPoolExecutor(max_workers=threads) as writers:
+                    written = list(writers.map(commit, staged_files.items()))
+            else:
+                written = [commit(staged_file) for staged_file in staged_files.items()]
+        counts['written'] = sum(written)
+        counts['unchanged'] = len(written) - counts['written']
+
+        try:
+            with open(manifest_file, 'r') as file:
+                previous_files = json.load(file)
+        except FileNotFoundError:
+            previous_files = _files_under(generated_dirs)
+        for filepath in previous_files:
+            if filepath not in staged_files and os.path.exists(filepath):
+                os.remove(filepath)
+                counts['deleted'] += 1
+
+        with open(manifest_file, 'w') as file:
+            json.dump(sorted(staged_files), file, indent=0)
+    finally:
+        _staged_files = None
+
+def open_log(logfile, mode='a'):
+    """Opens logfile for buffered writing, replacing any handler already open for it, and returns its logger."""
+    logger = logging.getLogger(f"{file_loggers.name}.{str(logfile).replace('.', '_')}")
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+
+    if _log_queue is None:
+        handler = BufferedFileHandler(logfile, mode=mode)
+        handler.terminator = ''
+    else:
+        handler = logging.handlers.QueueHandler(_log_queue)
+    logger.addHandler(handler)
+    return logger
+
+def get_file_logger(logfile):
+    """Returns the logger which writes to logfile, opening the file on first use."""
+    logger = logging.getLogger(f"{file_loggers.name}.{str(logfile).replace('.', '_')}")
+    if not logger.handlers:
+        logger = open_log(logfile)
+    return logger
+
+def flush_logs():
+    """Writes buffered log records to disk, e.g. before a log file is read back."""
+    for logger in list(logging.Logger.manager.loggerDict.values()):
+        for handler in getattr(logger, 'handlers', []):
+            if isinstance(handler, BufferedFileHandler):
+                handler.flush_buffer()
+
+def debug_enabled(logfile):
+    """Whether DEBUG records for logfile are written, so expensive debug output can be skipped entirely."""
+    return get_file_logger(logfile).isEnabledFor(logging.DEBUG)
+
 def write_log(logfile):
-    with open(logfile, 'w') as log_file:
-        log_file.write("")
+    """Starts logfile afresh, truncating any previous content."""
+    open_log(logfile, mode='w')
 
-def append_log(message, logfile):
+def append_log(message, logfile, level=logging.INFO, end='\n'):
     if message is None:
         message = ""
-    with open(logfile, 'a') as f:
-        f.write(message + '\n')
+    get_file_logger(logfile).log(level, f"{message}{end}", extra={'logfile': str(logfile)})
+
+def init_worker_logging(log_queue, level):
+    """Runs in each worker process of process_pool: log records are sent to the parent through log_queue."""
+    global _log_queue
+    _log_queue = log_queue
+    file_loggers.setLevel(level)
+
+@contextlib.contextmanager
+def process_pool(workers):
+    """
+    Provides a process pool whose workers log to this process's log files, or None if workers is 1 or less.
+
+    Workers are spawned rather than forked, so they never inherit (and later duplicate) this
+    process's unflushed log buffers; their records are written by a listener thread here instead.
 
-def load_collected_data(file_path):
-    if os.path.exists(file_path):
-        with open(file_path, 'rb') as f:
-            return pickle.load(f)
-    return None
+    Args:
+        workers (int): Number of worker processes.
+    """
+    if workers <= 1:
+        yield None
+        return
+
+    mp_context = multiprocessing.get_context('spawn')
+    log_queue = mp_context.Queue()
+    listener = logging.handlers.QueueListener(log_queue, LogDispatchHandler())
+    listener.start()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=init_worker_logging,
+                                 initargs=(log_queue, file_loggers.getEffectiveLevel())) as executor:
+            yield executor
+    finally:
+        listener.stop()
+
+def load_collected_data(file_path, header_only=False):
+    """
+    Loads collected data, see mods2docs.data_format. Pickles written by older versions are still read.
+
+    Args:
+        file_path (str): Path of the collected data file.
+        header_only (bool): If True, only the header (``archs`` and any ``fingerprints``) is needed; older
+            pickles, which have no header, are still loaded whole.
+    """
+    if not os.path.exists(file_path):
+        return None
+    if data_format.is_data_file(file_path):
+        return data_format.load(file_path, header_only)
+    with open(file_path, 'rb') as f:
+        return pickle.load(f)
 
 
 def save_collected_data(file_path, data):
-    """Saves collected data as a pickle file."""
-    with open(file_path, 'wb') as f:
-        pickle.dump(data, f)
+    """
+    Saves collected data in the versioned format of mods2docs.data_format.
+
+    It is written to a temporary file which replaces file_path once complete, so an interrupted save never
+    leaves a truncated data file behind.
+    """
+    temp_path = f"{file_path}.tmp"
+    data_format.save(temp_path, data)
+    os.replace(temp_path, file_path)
+
+def save_collected_data_in_background(file_path, data):
+    """
+    Saves collected data like save_collected_data, in a background thread, see wait_for_background_saves.
+
+    The data must not be modified until the save has finished.
+    """
+    def save():
+        try:
+            save_collected_data(file_path, data)
+        except Exception as e:
+            logging.error(f"Failed to save collected data to {file_path}: {e}")
+            append_log(f"Failed to save collected data to {file_path}: {e}", config.main_log_file,
+                       level=logging.WARNING)
+
+    thread = threading.Thread(target=save, name="save-collected-data")
+    thread.start()
+    _background_saves.append(thread)
+
+def wait_for_background_saves():
+    """Waits until collected data saved with save_collected_data_in_background has been written."""
+    while _background_saves:
+        _background_saves.pop().join()
+
+def peak_memory_mb():
+    """Returns the peak resident memory of this process so far, in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
 def load_module(module_type, module_name):
     """
@@ -1,8 +1,243 @@
 #Common writer functions
 import os
+import re
+import sys
+import functools
 from mods2docs import config
 
+# PackageTable of the collected data the writers were last given, see get_package_table()
+_package_table = None
+# DependencyGraph of that table, see get_dependency_graph()
+_dependency_graph = None
+
 def setup_writer_directories():
     os.makedirs(config.IMPORTS_DIR, exist_ok=True)
     os.makedirs(config.STACKS_DIR, exist_ok=True)
     os.makedirs(config.CUSTOM_DIR, exist_ok=True)
+
+def generated_directories():
+    """Directories the writer fills with generated files only, see utils.staged_output."""
+    return [config.STACKS_DIR, config.IMPORTS_DIR]
+
+def arch_title(arch):
+    """Title of an architecture in the docs, e.g. Icelake for icelake."""
+    return arch.capitalize()
+
+class PackageTable:
+    """
+    The collected data as a table of packages by architecture, built once, so writers handle any
+    number of architectures without nested lookups per package and architecture.
+
+    Architectures are numbered in collection (modulepath) order. Each (category, package) is a row;
+    ``latest[arch_id][row]`` holds its (module_info, creation_date, installer) on that architecture, or None.
+    ``versions[arch_id][package_id]`` lists each package's versions on that architecture, in any category.
+    Category, package and version strings are interned.
+    """
+
+    def __init__(self, package_infos, latest_version_info):
+        self.archs = list(package_infos)
+        self.arch_ids = {arch: arch_id for arch_id, arch in enumerate(self.archs)}
+
+        self.packages = []
+        self.package_ids = {}
+        self.versions = [[] for _ in self.archs]
+        for arch_id, infos in enumerate(package_infos.values()):
+            arch_versions = self.versions[arch_id]
+            for key in infos:
+                _, package, version = key.split('|')
+                package_id = self._package_id(package)
+                while len(arch_versions) <= package_id:
+                    arch_versions.append([])
+                arch_versions[package_id].append(sys.intern(version))
+
+        self.rows = {}
+        self.categories = []
+        self.row_packages = []
+        self.latest = [[] for _ in self.archs]
+        for key, infos in latest_version_info.items():
+            category, package = key.split('|')
+            self.rows[(category, package)] = len(self.categories)
+            self.categories.append(sys.intern(category))
+            self.row_packages.append(self._package_id(package))
+            for arch_id, arch in enumerate(self.archs):
+                self.latest[arch_id].append(infos.get(arch))
+        for arch_versions in self.versions:
+            arch_versions.extend([] for _ in range(len(self.packages) - len(arch_versions)))
+
+    def _package_id(self, package):
+        package_id = self.package_ids.get(package)
+        if package_id is None:
+            package_id = self.package_ids[package] = len(self.packages)
+            self.packages.append(sys.intern(package))
+        return package_id
+
+    def row(self, category, package):
+        """Row of a (category, package), or None if it has no latest version on any architecture."""
+        return self.rows.get((category, package))
+
+    def latest_infos(self, row):
+        """(arch, (module_info, creation_date, installer)) for each architecture the row has a latest version on."""
+        return [(arch, self.latest[arch_id][row]) for arch_id, arch in enumerate(self.archs)
+                if self.latest[arch_id][row] is not None]
+
+    def latest_info(self, row):
+        """
+        Module information of the row's latest version on the first architecture which has one
+        (checking the last architecture regardless), or None.
+        """
+        if row is None or not self.archs:
+            return None
+        for arch_id in range(len(self.archs) - 1):
+            info = self.latest[arch_id][row]
+            if info is not None and info[1]:
+                return info[0]
+        info = self.latest[-1][row]
+        return None if info is None else info[0]
+
+    def dependencies(self, row):
+        """Modules loaded by the row's latest version on any architecture."""
+        dependencies = set()
+        if row is not None:
+            for _, (module_info, _, _) in self.latest_infos(row):
+                dependencies.update(module_info.get('Loaded Modules', []))
+        return dependencies
+
+    def package_versions(self, package):
+        """Versions of a package, in any category, on each architecture."""
+        package_id = self.package_ids.get(package)
+        return {arch: [] if package_id is None else self.versions[arch_id][package_id]
+                for arch_id, arch in enumerate(self.archs)}
+
+def get_package_table(package_infos, latest_version_info):
+    """Returns the PackageTable of the collected data, building it only when given different data."""
+    global _package_table
+    if (_package_table is None or _package_table[0] is not package_infos
+            or _package_table[1] is not latest_version_info):
+        _package_table = (package_infos, latest_version_info, PackageTable(package_infos, latest_version_info))
+    return _package_table[2]
+
+@functools.lru_cache(maxsize=None)
+def version_key(version):
+    """Natural sort key of a version, e.g. 12.2.0 sorts after 9.3.0; cached per version string."""
+    return [int(x) if x.isdigit() else x for x in re.split(r'(\d+)', version)]
+
+@functools.lru_cache(maxsize=None)
+def split_module(module):
+    """(package, version) of a loaded module such as GCC/12.2.0, cached per module string."""
+    package, _, version = module.partition('/')
+    return package, version.split('/')[0]
+
+class DependencyGraph:
+    """
+    Dependencies between packages, built once from a PackageTable and the primary category of each package.
+
+    Each package depends on the packages its latest version loads (``Loaded Modules``) on any architecture,
+    each at the latest version loaded. Packages loaded but not found have the category 'unknown'.
+    """
+
+    def __init__(self, table, package_ref):
+        self.requires = {}
+        self.required_by = {}
+        self._closures = None
+        for package, category in package_ref.items():
+            row = table.row(category, package)
+            if row is None:
+                continue
+            latest_versions = {}
+            for dependency in sorted(table.dependencies(row)):
+                dep_package, version = split_module(dependency)
+                if dep_package not in latest_versions or version_key(version) > version_key(latest_versions[dep_package]):
+                    latest_versions[dep_package] = version
+            edges = sorted(((dep_package, version, package_ref.get(dep_package, 'unknown'))
+                            for dep_package, version in latest_versions.items()),
+                           key=lambda edge: f"{edge[0]}/{edge[1]}".casefold())
+            self.requires[package] = edges
+            for dep_package, _, _ in edges:
+                self.required_by.setdefault(dep_package, []).append(package)
+
+    def dependencies(self, package):
+        """(package, version, category) of each direct dependency of a package, sorted case-insensitively."""
+        return self.requires.get(package, [])
+
+    def dependents(self, package):
+        """Packages which directly depend on a package, in package_ref order."""
+        return self.required_by.get(package, [])
+
+    def closure(self, package):
+        """All packages a package depends on, directly or not (including itself if it is in a cycle)."""
+        if self._closures is None:
+            self._build_closures()
+        return self._closures.get(package, frozenset())
+
+    def cycles(self):
+        """Groups of packages which depend on each other, each sorted; empty if the graph has no cycles."""
+        if self._closures is None:
+            self._build_closures()
+        return self._cycles
+
+    def _build_closures(self):
+        # Tarjan's algorithm, iteratively; components come out dependencies first, so each closure is
+        # the union of the closures of the components it depends on
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        self._closures = {}
+        self._cycles = []
+        for root in self.requires:
+            if root in index:
+                continue
+            work = [(root, iter(self.requires.get(root, [])))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, edges = work[-1]
+                for dep_package, _, _ in edges:
+                    if dep_package not in index:
+                        index[dep_package] = low[dep_package] = len(index)
+                        stack.append(dep_package)
+                        on_stack.add(dep_package)
+                        work.append((dep_package, iter(self.requires.get(dep_package, []))))
+                        break
+                    if dep_package in on_stack:
+                        low[node] = min(low[node], index[dep_package])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        self._add_component(component)
+
+    def _add_component(self, component):
+        members = set(component)
+        closure = set()
+        in_cycle = len(component) > 1
+        for member in component:
+            for dep_package, _, _ in self.requires.get(member, []):
+                if dep_package in members:
+                    in_cycle = True
+                else:
+                    closure.add(dep_package)
+                    closure.update(self._closures.get(dep_package, ()))
+        if in_cycle:
+            closure.update(members)
+            self._cycles.append(sorted(members))
+        closure = frozenset(closure)
+        for member in component:
+            self._closures[member] = closure
+
+def get_dependency_graph(table, package_ref):
+    """Returns the DependencyGraph of a PackageTable, building it only when given a different table or package_ref."""
+    global _dependency_graph
+    if _dependency_graph is None or _dependency_graph[0] is not table or _dependency_graph[1] is not package_ref:
+        _dependency_graph = (table, package_ref, DependencyGraph(table, package_ref))
+    return _dependency_graph[2]
@@ -1,10 +1,15 @@
 import os
 import re
+import logging
 from datetime import datetime
-from mods2docs import config, utils
-from mods2docs.writer.common import setup_writer_directories
+from mods2docs import config, utils, tracing
+from mods2docs.writer.common import (setup_writer_directories, generated_directories, arch_title, get_package_table,
+                                     get_dependency_graph)
 # Functions to write rst files
 
+# Number of packages sent to a worker process at a time, see write_all_files
+_RENDER_CHUNK_SIZE = 64
+
 
 def write_stacks_index(stacks_dir, current_date, output_dirs):
     """
@@ -25,7 +30,7 @@ def write_stacks_index(stacks_dir, current_date, output_dirs):
         ".. note::\n\n"
         f"   Last updated: {current_date}\n\n"
         "This comprehensive index includes all packages installed on Stanage, with content generated automatically. It is updated regularly to reflect the latest installations and mirrors the full range of packages available on Stanage.\n\n"
-        "Each package entry includes minimal documentation, providing key details such as descriptions, version information, direct dependencies for the latest version, URLs, and build log locations.\n\n"
+        "Each package entry includes minimal documentation, providing key details such as descriptions, version information, direct dependencies for the latest version, the packages which use it, URLs, and build log locations.\n\n"
         ".. toctree::\n"
         "    :maxdepth: 1\n"
         "    :glob:\n\n"
@@ -70,7 +75,14 @@ def write_package_file(category_dir, category, package, output_dir):
     )
     utils.write_file(package_file, content)
 
-def write_sidebar_file(package, category, latest_version_info, output_dir):
+def write_sidebar_file(package, category, latest_version_info, output_dir, archs=None):
+    """
+    Writes the sidebar of a package: its latest version and installation date on each architecture, and its URL.
+
+    Args:
+        archs (list, optional): The architectures, in the order they are listed; those of config.modulepaths
+            if not given.
+    """
     def extract_version(version_with_toolchain):
         """Extracts the version number from a version string, removing toolchain if present."""
         match = re.match(r'^[^-]+(?:-[^-0-9][^-]*)', version_with_toolchain)
@@ -79,52 +91,35 @@ def write_sidebar_file(package, category, latest_version_info, output_dir):
         return version_with_toolchain
 
     key = f"{category}|{package}"
-    
-    # Initialize version, date, and URL variables
-    version_number_icelake = 'N/A'
-    creation_date_icelake = 'N/A'
-    version_number_znver = 'N/A'
-    creation_date_znver = 'N/A'
-    homepage_url = 'N/A'
+    if archs is None:
+        archs = list(config.modulepaths)
 
-    # Access the entry for the specific package and category
-    if key in latest_version_info:
-        # Get information for Icelake architecture
-        icelake_info = latest_version_info[key].get('icelake', None)
-        if icelake_info and len(icelake_info) > 0 and icelake_info[0]:
-            version_number_icelake = icelake_info[0].get('EB Version', None)
-            if version_number_icelake is None:
+    # Latest version and installation date on each architecture, and the URL of the first which has one
+    fields = []
+    homepage_url = 'N/A'
+    for arch in archs:
+        version_number = 'N/A'
+        creation_date = 'N/A'
+        arch_info = latest_version_info.get(key, {}).get(arch, None)
+        if arch_info and len(arch_info) > 0 and arch_info[0]:
+            version_number = arch_info[0].get('EB Version', None)
+            if version_number is None:
                 # Fallback: Extract version from the directory name if EB Version is not available
-                root = icelake_info[0].get('Root', 'N/A')
-                version_number_icelake = extract_version(root.split('/')[-1] if root else 'N/A')
-            creation_date_icelake = icelake_info[1] if len(icelake_info) > 1 else 'N/A'
+                root = arch_info[0].get('Root', 'N/A')
+                version_number = extract_version(root.split('/')[-1] if root else 'N/A')
+            creation_date = arch_info[1] if len(arch_info) > 1 else 'N/A'
             # Extract URL from WhatIs Information
-            whatis_info = icelake_info[0].get('WhatIs Information', [])
-            homepage_url = next((info.split(': ')[1] for info in whatis_info if info.startswith('URL:')), 'N/A')
-    
-        # Get information for Znver3 architecture
-        znver_info = latest_version_info[key].get('znver3', None)
-        if znver_info and len(znver_info) > 0 and znver_info[0]:
-            version_number_znver = znver_info[0].get('EB Version', None)
-            if version_number_znver is None:
-                # Fallback: Extract version from the directory name if EB Version is not available
-                root = znver_info[0].get('Root', 'N/A')
-                version_number_znver = extract_version(root.split('/')[-1] if root else 'N/A')
-            creation_date_znver = znver_info[1] if len(znver_info) > 1 else 'N/A'
-            # Update URL if available in Znver3 info
             if homepage_url == 'N/A':
-                whatis_info = znver_info[0].get('WhatIs Information', [])
+                whatis_info = arch_info[0].get('WhatIs Information', [])
                 homepage_url = next((info.split(': ')[1] for info in whatis_info if info.startswith('URL:')), 'N/A')
-
+        fields.append(f"   :Latest Version ({arch_title(arch)}): {version_number}\n"
+                      f"   :Installed on ({arch_title(arch)}): {creation_date}\n")
 
     # Write sidebar file content
     sdbr_file = os.path.join(config.IMPORTS_DIR, f"{utils.make_filename(package, 'sdbr', output_dir)}.rst")
     content = (
         f".. sidebar:: {package}\n\n"
-        f"   :Latest Version (Icelake): {version_number_icelake}\n"
-        f"   :Installed on (Icelake): {creation_date_icelake}\n"
-        f"   :Latest Version (Znver3): {version_number_znver}\n"
-        f"   :Installed on (Znver3): {creation_date_znver}\n"
+        + ''.join(fields) +
         f"   :URL: {homepage_url}\n"
     )
     utils.write_file(sdbr_file, content)
@@ -155,100 +150,116 @@ def write_custom_file(package, output_dir):
     cust_file = os.path.join(config.CUSTOM_DIR, f"{utils.make_filename(package, 'cust', output_dir)}.rst")
     utils.write_file(cust_file, "")
 
-def write_dependencies(dependencies, output_dir, category, package, package_ref):
+def write_dependencies(dependencies, output_dir, package, dependents=()):
+    """
+    Writes the direct dependencies of a package's latest version, and the packages whose latest version
+    depends on it, each linked to its page.
+
+    Args:
+        dependencies (list): (package, version, category) of each dependency, as DependencyGraph.dependencies
+            gives them.
+        dependents (list): (package, category) of each package which depends on it, see DependencyGraph.dependents.
+    """
     dpnd_file = os.path.join(config.IMPORTS_DIR, f"{utils.make_filename(package, 'dpnd', output_dir)}.rst")
+    content = ""
     if dependencies:
-        content = f".. dropdown:: Direct dependencies for latest version of {package}\n\n"
-        def version_key(version):
-            return [int(x) if x.isdigit() else x for x in re.split(r'(\d+)', version)]
-        
-        # Dictionary to store the latest version for each package
-        latest_versions = {}
-        
-        # Iterate over the paths
-        for dependency in dependencies:
-            package, version = dependency.split('/')[:2]
-            # Store the latest version using dict, which will naturally keep the last inserted version
-            if package not in latest_versions or version_key(version) > version_key(latest_versions[package]):
-                latest_versions[package] = version
-        
-        # Collect the latest package versions
-        latest_package_versions = [f"{pkg}/{ver}" for pkg, ver in latest_versions.items()]
-        sorted_dependencies = sorted(latest_package_versions, key=str.casefold) # case-insensitive sort
-
-        for dep in sorted_dependencies:
-            dep_package = dep.split('/')[0]
-            ref_category = package_ref.get(dep_package, 'unknown')
-            dep_link = f":ref:`{dep} <{utils.make_reference(dep_package, ref_category, output_dir)}>`"
+        content += f".. dropdown:: Direct dependencies for latest version of {package}\n\n"
+        for dep_package, version, ref_category in dependencies:
+            dep_link = f":ref:`{dep_package}/{version} <{utils.make_reference(dep_package, ref_category, output_dir)}>`"
             content += f"   - {dep_link}\n"
-    else:
-        content = ""
+    if dependents:
+        if content:
+            content += "\n"
+        content += f".. dropdown:: Packages using {package}\n\n"
+        for dependent, ref_category in sorted(dependents, key=lambda dependent: dependent[0].casefold()):
+            content += f"   - :ref:`{dependent} <{utils.make_reference(dependent, ref_category, output_dir)}>`\n"
     utils.write_file(dpnd_file, content)
 
-def write_ml_file(package, package_infos, output_dir):
-    import_file = os.path.join(config.IMPORTS_DIR, f"{utils.make_filename(package, 'ml', output_dir)}.rst")
-
-    # Initialize the file with .. tabs:: only if it's newly created
-    if not os.path.exists(import_file):
-        utils.write_file(import_file, ".. tabs::\n\n")
-
-    with open(import_file, 'r') as imp_f:
-        existing_content = imp_f.read()
+def build_ml_index(package_infos):
+    """
+    Indexes the versions of every package on each architecture, in the order they appear in package_infos.
 
-    # Initialize entries for architectures
-    entries = {'icelake': [], 'znver3': []}
+    Args:
+        package_infos (dict): Package information by architecture, keyed by "category|package|version".
 
-    # Collect module load lines for each architecture
-    for arch in package_infos:
-        versions = [key.split('|')[2] for key in package_infos[arch] if key.split('|')[1] == package]
-        entries[arch].extend([f"            module load {package}/{ver}\n" for ver in versions])
+    Returns:
+        dict: Maps each package to a dict of architecture -> list of versions.
+    """
+    ml_index = {}
+    for arch, infos in package_infos.items():
+        for key in infos:
+            _, package, version = key.split('|')
+            ml_index.setdefault(package, {}).setdefault(arch, []).append(version)
+    return ml_index
+
+def ml_file_path(package, output_dir):
+    """Path of a package's module load file."""
+    return os.path.join(config.IMPORTS_DIR, f"{utils.make_filename(package, 'ml', output_dir)}.rst")
+
+def render_ml_file(package, versions_by_arch):
+    """
+    Renders the module load commands for every version of a package, grouped in a tab per architecture.
 
-    # Remove duplicates
-    for arch in entries:
-        entries[arch] = list(dict.fromkeys(entries[arch]))
+    Args:
+        package (str): The package.
+        versions_by_arch (dict): Versions of the package on every architecture, in the order of the tabs,
+            e.g. from build_ml_index; architectures without versions get no tab.
 
-    # Prepare content to be added
-    content_dict = {'icelake': '', 'znver3': ''}
+    Returns:
+        str: The content of the package's ml file.
+    """
+    content = ".. tabs::\n\n"
+    for i, (arch, versions) in enumerate(versions_by_arch.items()):
+        if versions:
+            content += "\n" if i else ""
+            content += f"    .. group-tab:: {arch_title(arch)}\n\n        .. code-block:: console\n\n"
+            content += ''.join(f"            module load {package}/{version}\n" for version in dict.fromkeys(versions))
+            content += "\n"
+    return content
+
+def parse_ml_file(content, archs):
+    """Reads the versions on each of archs back from an ml file rendered by render_ml_file."""
+    archs_by_tab = {arch_title(arch): arch for arch in archs}
+    versions_by_arch = {arch: [] for arch in archs}
+    versions = None
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith(".. group-tab:: "):
+            versions = versions_by_arch.get(archs_by_tab.get(line[len(".. group-tab:: "):]))
+        elif line.startswith("module load ") and versions is not None:
+            versions.append(line[len("module load "):].split('/', 1)[1])
+    return versions_by_arch
+
+def merge_ml_files(package, content, other_content, archs):
+    """
+    Merges two ml files of a package, e.g. rendered for two titles sharing an output directory.
 
-    # Add content for icelake if it doesn't already exist
-    if entries['icelake'] and "    .. group-tab:: Icelake" not in existing_content:
-        content_dict['icelake'] = "    .. group-tab:: Icelake\n\n        .. code-block:: console\n\n" + ''.join(entries['icelake']) + "\n"
-    elif entries['icelake']:
-        new_icelake_content = re.sub(
-            r"(    .. group-tab:: Icelake\n\n        .. code-block:: console\n\n)((?:\n|.)*?)(\n\s*.. group-tab::|\Z)",
-            lambda match: match.group(1) + ''.join(entries['icelake']) + match.group(3),
-            existing_content,
-            flags=re.MULTILINE
-        )
-        content_dict['icelake'] = new_icelake_content
-
-    # Add content for znver3 if it doesn't already exist
-    if entries['znver3'] and "    .. group-tab:: Znver3" not in existing_content:
-        content_dict['znver3'] = "\n    .. group-tab:: Znver3\n\n        .. code-block:: console\n\n" + ''.join(entries['znver3']) + "\n"
-    elif entries['znver3']:
-        new_znver3_content = re.sub(
-            r"(    .. group-tab:: Znver3\n\n        .. code-block:: console\n\n)((?:\n|.)*?)(\n\s*.. group-tab::|\Z)",
-            lambda match: match.group(1) + ''.join(entries['znver3']) + match.group(3),
-            existing_content,
-            flags=re.MULTILINE
-        )
-        content_dict['znver3'] = new_znver3_content
+    Args:
+        archs (list): Every architecture either file may have a tab for, in the order of the tabs; tabs of
+            other architectures are dropped.
 
-    # Reconstruct the new content for the file
-    new_content = existing_content
+    Returns:
+        str: An ml file with the versions of both on each of archs, those of content first.
+    """
+    versions_by_arch = parse_ml_file(content, archs)
+    for arch, versions in parse_ml_file(other_content, archs).items():
+        versions_by_arch[arch].extend(versions)
+    return render_ml_file(package, versions_by_arch)
 
-    # Ensure .. tabs:: is at the start
-    if not new_content.startswith(".. tabs::"):
-        new_content = ".. tabs::\n\n" + new_content
+def write_ml_file(package, package_infos, output_dir, ml_index=None):
+    """
+    Writes the module load commands for every version of a package, grouped in a tab per architecture.
 
-    if content_dict['icelake'] and "    .. group-tab:: Icelake" not in new_content:
-        new_content += content_dict['icelake']
-    if content_dict['znver3'] and "    .. group-tab:: Znver3" not in new_content:
-        new_content += content_dict['znver3']
+    The file is rendered from the data alone, see render_ml_file, whatever was written before.
 
-    # Write the final content back to the file
-    with open(import_file, 'w') as imp_f:
-        imp_f.write(new_content)
+    Args:
+        ml_index (dict, optional): Versions by package and architecture from build_ml_index; built
+            from package_infos if not given, but should be built once when writing many packages.
+    """
+    if ml_index is None:
+        ml_index = build_ml_index(package_infos)
+    versions_by_arch = {arch: ml_index.get(package, {}).get(arch, []) for arch in package_infos}
+    utils.write_file(ml_file_path(package, output_dir), render_ml_file(package, versions_by_arch))
 
 def clean_all_index_if_needed(all_category_dir):
     """
@@ -260,23 +271,53 @@ def clean_all_index_if_needed(all_category_dir):
     """
     index_file = os.path.join(all_category_dir, "index.rst")
     
-    if not os.path.exists(index_file):
+    if not utils.file_exists(index_file):
         return  # If index.rst doesn't exist, nothing to do
 
     # Count the number of files in the All/ directory (excluding index.rst itself)
-    all_files = [f for f in os.listdir(all_category_dir) if f != "index.rst"]
+    all_files = [f for f in utils.list_files(all_category_dir) if f != "index.rst"]
 
     if len(all_files) <= 1:  # Only index.rst or empty
-        with open(index_file, "r") as file:
-            lines = file.readlines()
+        lines = utils.read_file(index_file).splitlines(keepends=True)
 
         # Remove the "    ./*" line
-        with open(index_file, "w") as file:
-            for line in lines:
-                if not line.strip() == "./*":  # Remove exact match
-                    file.write(line)
+        utils.write_file(index_file, ''.join(line for line in lines if not line.strip() == "./*"))  # Remove exact match
+
+def write_package_files(category_dir, category, package, output_dir, latest_info, latest_version_info, package_infos,
+                        ml_index, dependencies, dependents):
+    """Writes the package, ml, dscr, sdbr, inst, cust and dpnd files of one package."""
+    write_package_file(category_dir, category, package, output_dir)
+    write_ml_file(package, package_infos, output_dir, ml_index)
+    write_description_file(package, latest_info, output_dir)
+    write_sidebar_file(package, category, latest_version_info, output_dir, list(package_infos))
+    write_installation_file(package, latest_info, output_dir)
+    write_custom_file(package, output_dir)
+    write_dependencies(dependencies, output_dir, package, dependents)
+
+def render_package_files(task):
+    """
+    Renders the files of one package, see write_package_files, without writing them. Runs in worker processes.
+
+    Args:
+        task (tuple): The arguments of write_package_files.
 
-def write_all_files(title, output_dir, package_infos, package_ref, latest_version_info):
+    Returns:
+        dict: The content of each file, by path.
+    """
+    with tracing.span("render package", "package", package=task[2]):
+        return utils.render_output(write_package_files, *task)
+
+def write_all_files(title, output_dir, package_infos, package_ref, latest_version_info, executor=None, merge_ml=True):
+    """
+    Writes the index files of a title and the files of each of its packages.
+
+    Args:
+        executor (concurrent.futures.Executor, optional): Renders package files in parallel, see
+            render_package_files. The output is the same as without one.
+        merge_ml (bool): Merge ml files with those staged earlier in this run (see utils.staged_output),
+            rather than replace them. Files on disk are never merged, so without staged output (as when
+            write_all_files is called on its own) each title replaces the ml files of the titles before it.
+    """
     # Create stacks index file
     output_dir_path = os.path.join(config.STACKS_DIR, output_dir)
     os.makedirs(output_dir_path, exist_ok=True)
@@ -303,6 +344,14 @@ def write_all_files(title, output_dir, package_infos, package_ref, latest_versio
 
     links_for_all_index = []
     links_for_main_index = []
+    package_tasks = []
+    table = get_package_table(package_infos, latest_version_info)
+    graph = get_dependency_graph(table, package_ref)
+    for cycle in graph.cycles():
+        utils.append_log(f"Warning: Dependency cycle between {', '.join(cycle)}.", config.main_log_file,
+                         level=logging.WARNING)
+    # write_ml_file and write_sidebar_file only need the architectures of package_infos
+    archs = dict.fromkeys(table.archs)
     for package, primary_category in package_ref.items():
         if primary_category != current_category:
             current_category = primary_category
@@ -319,50 +368,51 @@ def write_all_files(title, output_dir, package_infos, package_ref, latest_versio
                 links_for_main_index.append(link_main_index)
                 added_indexes.add(category_index_file)
 
-        latest_versions = {}
-        latest_creation_dates = {}
-        dependencies = set()
-
-        for arch in package_infos:
-            key = f"{primary_category}|{package}"
-            if key in latest_version_info and arch in latest_version_info[key]:
-                latest_version = latest_version_info[key][arch][1]
-                latest_versions[arch] = latest_version
-
-                module_info, creation_date, installer = latest_version_info[key][arch]
-                latest_creation_dates[arch] = creation_date
-                dependencies.update(module_info.get('Loaded Modules', []))
-
-        latest_info_arch = 'icelake' if latest_versions.get('icelake') else 'znver3'
-        latest_info = latest_version_info.get(key, {}).get(latest_info_arch, (None, None, None))[0]
+        row = table.row(primary_category, package)
+        latest_info = table.latest_info(row)
 
         if latest_info is None:
-            append_log(f"Warning: Missing latest info for {primary_category} | {package}. Skipping.",
-                       config.main_log_file)
+            utils.append_log(f"Warning: Missing latest info for {primary_category} | {package}. Skipping.",
+                             config.main_log_file, level=logging.WARNING)
             continue
 
         if package not in all_category_packages:
-            write_package_file(category_dir, primary_category, package, output_dir)
-            write_ml_file(package, package_infos, output_dir)
-            write_description_file(package, latest_info, output_dir)
-            write_sidebar_file(package, primary_category, latest_version_info, output_dir)
-            write_installation_file(package, latest_info, output_dir)
-            write_custom_file(package, output_dir)
-            write_dependencies(list(dependencies), output_dir, primary_category, package, package_ref)
+            # Only plain data goes in a task, so it can be sent to a worker process
+            package_tasks.append((category_dir, primary_category, package, output_dir, latest_info,
+                                  {f"{primary_category}|{package}": dict(table.latest_infos(row))}, archs,
+                                  {package: table.package_versions(package)},
+                                  graph.dependencies(package),
+                                  [(dependent, package_ref[dependent]) for dependent in graph.dependents(package)]))
 
             all_category_packages.add(package)
 
         link = f"* :ref:`{package} <{utils.make_reference(package, primary_category, output_dir)}>`\n"
         links_for_all_index.append(link)
 
+    # Render the package files, in worker processes if there is an executor, and stage them in package order
+    if executor is None:
+        rendered_packages = tracing.map_traced(map, render_package_files, package_tasks)
+    else:
+        rendered_packages = tracing.map_traced(executor.map, render_package_files, package_tasks,
+                                               chunksize=_RENDER_CHUNK_SIZE)
+    # An earlier title may have tabs for architectures this one lacks
+    ml_archs = list(dict.fromkeys([*config.modulepaths, *table.archs]))
+    for task, rendered in zip(package_tasks, rendered_packages):
+        package = task[2]
+        for filepath, content in rendered.items():
+            # An ml file already written this run, by a title sharing output_dir, gets this title's versions added
+            if merge_ml and filepath == os.path.normpath(ml_file_path(package, output_dir)):
+                existing_content = utils.staged_content(filepath)
+                if existing_content is not None:
+                    content = merge_ml_files(package, existing_content, content, ml_archs)
+            utils.write_file(filepath, content)
+
     # Write sorted lines to the file
     links_for_all_index.sort(key=str.casefold)
-    with open(all_category_index_file, 'a') as file:
-        file.writelines(links_for_all_index)
+    utils.append_file(all_category_index_file, ''.join(links_for_all_index))
 
     links_for_main_index.sort(key=str.casefold)
-    with open(stack_index_file, 'a') as file:
-        file.writelines(links_for_main_index)
+    utils.append_file(stack_index_file, ''.join(links_for_main_index))
 
     clean_all_index_if_needed(all_category_dir)
 
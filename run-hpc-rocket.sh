@@ -4,9 +4,11 @@
 # backing up generated data, and running a post-processing pipeline.
 # The main steps include:
 # - Setting up environment variables for remote server access.
+# - Checking on the cluster whether any module file changed since the data was last collected; if not, the
+#   next three steps are skipped.
 # - Removing directories and files from previous runs.
 # - Submitting a SLURM job using `hpc-rocket`.
-# - Backing up log and pickle files to a timestamped location.
+# - Backing up log and collected data files to a timestamped location.
 # - Running mods2docs pipeline with the specified parser and writer.
 source config.env
 
@@ -22,23 +24,33 @@ envsubst < mods2docs/config.yml > hpc_rocket_config.yml
 
 DATESTAMP="$(date +%Y%m%d-%H%M)"                # Timestamp for backups
 
-# Remove previous runs' directories and files to ensure a clean start
-[ -d "${STACKS}/" ] && rm -rf "${STACKS}/"
-[ -d "${IMPORTS}/" ] && rm -rf "${IMPORTS}/"
-[ -f "${DATA_DIR}/*.log" ] && rm -f "${DATA_DIR}/*.log"
-[ -f "${DATA_DIR}/*.pkl" ] && rm -f "${DATA_DIR}/*.pkl"
-
-# Submit job to SLURM via hpc-rocket, using the specified configuration file
-hpc-rocket launch --watch hpc_rocket_config.yml
-
-# Run post-processing on the data returned by the SLURM job
-mkdir -p ${DATA_DIR}/backups/                          # Create backup directory if it doesn't exist
-
-# Back up log and pickle files with a timestamp
-for file in ${DATA_DIR}/*.{pkl,log}; do
-    cp "${file}" "${file}-${DATESTAMP}.bk" && echo "Backed up ${file}"
-    mv ${DATA_DIR}/*bk ${DATA_DIR}/backups/
-done
+# Ask the cluster whether any module file changed since the data was last collected: collect_data --check exits 0
+# if the collected data there is current. If so, and the data from that run is here, no SLURM job is submitted.
+# slurm.sh checks again in the job, in case the modules change while the job is queued.
+# The check runs on the login node ssh lands on and walks every modulepath there, stat()ing each module file, which
+# takes as long as the scan at the start of a collection.
+# hpc-rocket copies config.env and mods2docs to the remote home directory, where ssh starts
+REMOTE_CHECK="source config.env && module load ${CONDA_MODULE} && source activate ${ENV_NAME} && \
+python -m mods2docs.collect_data --parser lmod --check"
+if [ -f "${DATA_DIR}/${DATA_FILE}" ] && ssh "${REMOTE_USER}@${REMOTE_HOST}" "bash -lc '${REMOTE_CHECK}'"; then
+    echo "Module files unchanged since the data was last collected; not submitting a SLURM job"
+else
+    # Remove previous runs' files to ensure a clean start. Generated docs in ${STACKS}/ and ${IMPORTS}/ are kept:
+    # the pipeline only rewrites files whose content changed and deletes files it no longer generates
+    rm -f "${DATA_DIR:?}"/*.log "${DATA_DIR:?}"/*.m2d
+
+    # Submit job to SLURM via hpc-rocket, using the specified configuration file
+    hpc-rocket launch --watch hpc_rocket_config.yml
+
+    # Run post-processing on the data returned by the SLURM job
+    mkdir -p ${DATA_DIR}/backups/                          # Create backup directory if it doesn't exist
+
+    # Back up log and collected data files with a timestamp
+    for file in ${DATA_DIR}/*.{m2d,log}; do
+        cp "${file}" "${file}-${DATESTAMP}.bk" && echo "Backed up ${file}"
+        mv ${DATA_DIR}/*bk ${DATA_DIR}/backups/
+    done
+fi
 
 # Run the data processing pipeline, specifying the parser and writer types
 python -m mods2docs.start_pipeline --parser lmod --writer rest
@@ -1,6 +1,7 @@
 #!/bin/bash
 #SBATCH --time=00:15:00              # Set a maximum job run time of 15 minutes
 #SBATCH --mem=1G                      # Request 1 GB of memory
+#SBATCH --cpus-per-task=4             # Cores used to parse module files in parallel
 #SBATCH --job-name=API-collect-data   # Job name for identification
 #SBATCH --output=slurm.out            # Output file for SLURM job logs
 
@@ -33,5 +34,10 @@ echo "Environment setup is complete."
 # Create the data folder if it doesn't already exist
 mkdir -p $DATA_DIR
 
-# Run the data collection script with the specified parser
-python -m mods2docs.collect_data --parser lmod
+# Skip collection if no module file changed since the data was last collected
+if python -m mods2docs.collect_data --parser lmod --check; then
+  exit 0
+fi
+
+# Run the data collection script with the specified parser, parsing with one worker per allocated core
+python -m mods2docs.collect_data --parser lmod --workers ${SLURM_CPUS_PER_TASK:-1}
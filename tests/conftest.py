@@ -0,0 +1,28 @@
+import os
+import json
+import tempfile
+
+# mods2docs.config reads its settings when first imported; settings in the environment take precedence over
+# config.env, so point everything the tests may write at a scratch directory before any test imports mods2docs
+_scratch = tempfile.mkdtemp(prefix="mods2docs-tests-")
+for key, value in {
+    "CURRENT_DATE_FORMAT": "%Y-%m-%d",
+    "DATA_DIR": os.path.join(_scratch, "data"),
+    "STACKS_DIR": os.path.join(_scratch, "stacks"),
+    "IMPORTS_DIR": os.path.join(_scratch, "imports"),
+    "CUSTOM_DIR": os.path.join(_scratch, "imports", "custom"),
+    "BROKEN_SYMLINKS_FILE": "broken-symlinks.log",
+    "LOG_FILE": "log-collect-data.log",
+    "MAIN_LOG_FILE": "main-update-packages.log",
+    "DATA_FILE": "collected-data.m2d",
+    "PARSE_CACHE_FILE": "parse-cache.pkl",
+    "SLURM_INTERACTIVE_SESSION_IMPORT": "interactive.rst",
+    "MODULEPATHS": json.dumps({}),
+    "TITLES": json.dumps(["Tests"]),
+    "OUTPUT_DIRS": json.dumps(["tests"]),
+    "MODULE_CLASSES": json.dumps({"tools": "General purpose tools"}),
+}.items():
+    os.environ[key] = value
+os.makedirs(os.environ["DATA_DIR"], exist_ok=True)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
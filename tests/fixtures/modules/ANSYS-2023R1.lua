@@ -0,0 +1,16 @@
+-- Hand-written module: the root is computed, and EBROOT is only set through pathJoin
+local version = "2023R1"
+local base = pathJoin("/opt/apps/testapps/common/software/ANSYS", version)
+
+whatis([==[Description: ANSYS engineering simulation suite]==])
+whatis([==[URL: https://www.ansys.com]==])
+
+if os.getenv("ANSYS_LICENSE_SERVER") == nil then
+    setenv("ANSYSLMD_LICENSE_FILE", "1055@license.example.org")
+end
+
+load("intel/2022a")
+prepend_path("PATH", pathJoin(base, "v231/Framework/bin/Linux64"))
+setenv("EBROOTANSYS", pathJoin(base, "v231"))
+setenv("EBVERSIONANSYS", version)
+setenv("ANSYS_VERSION", "231")
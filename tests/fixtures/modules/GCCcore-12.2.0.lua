@@ -0,0 +1,35 @@
+help([==[
+
+Description
+===========
+The GNU Compiler Collection includes front ends for C, C++, Objective-C, Fortran, Java, and Ada,
+ as well as libraries for these languages (libstdc++, libgcj,...).
+
+
+More information
+================
+ - Homepage: https://gcc.gnu.org/
+]==])
+
+whatis([==[Description: The GNU Compiler Collection includes front ends for C, C++, Objective-C, Fortran, Java, and Ada,
+ as well as libraries for these languages (libstdc++, libgcj,...).]==])
+whatis([==[Homepage: https://gcc.gnu.org/]==])
+whatis([==[URL: https://gcc.gnu.org/]==])
+
+local root = "/opt/apps/testapps/el7/software/GCCcore/12.2.0"
+
+conflict("GCCcore")
+
+if not ( isloaded("binutils/2.39") ) then
+    load("binutils/2.39")
+end
+
+prepend_path("CMAKE_LIBRARY_PATH", pathJoin(root, "lib64"))
+prepend_path("LD_LIBRARY_PATH", pathJoin(root, "lib"))
+prepend_path("MANPATH", pathJoin(root, "share/man"))
+prepend_path("PATH", pathJoin(root, "bin"))
+setenv("EBROOTGCCCORE", root)
+setenv("EBVERSIONGCCCORE", "12.2.0")
+setenv("EBDEVELGCCCORE", pathJoin(root, "easybuild/GCCcore-12.2.0-easybuild-devel"))
+
+-- Built with EasyBuild version 4.7.0
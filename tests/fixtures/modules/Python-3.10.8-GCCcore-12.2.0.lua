@@ -0,0 +1,54 @@
+help([==[
+
+Description
+===========
+Python is a programming language that lets you work more quickly and integrate your systems
+ more effectively.
+
+
+More information
+================
+ - Homepage: https://python.org/
+
+
+Included extensions
+===================
+flit-core-3.8.0, pip-22.3.1, setuptools-65.5.0, wheel-0.38.4
+]==])
+
+whatis([==[Description: Python is a programming language that lets you work more quickly and integrate your systems
+ more effectively.]==])
+whatis([==[Homepage: https://python.org/]==])
+whatis([==[URL: https://python.org/]==])
+whatis([==[Extensions: flit-core-3.8.0, pip-22.3.1, setuptools-65.5.0, wheel-0.38.4]==])
+
+local root = "/opt/apps/testapps/el7/software/Python/3.10.8-GCCcore-12.2.0"
+
+conflict("Python")
+
+if not ( isloaded("GCCcore/12.2.0") ) then
+    load("GCCcore/12.2.0")
+end
+
+if not ( isloaded("bzip2/1.0.8-GCCcore-12.2.0") ) then
+    load("bzip2/1.0.8-GCCcore-12.2.0")
+end
+
+if not ( isloaded("zlib/1.2.12-GCCcore-12.2.0") ) then
+    load("zlib/1.2.12-GCCcore-12.2.0")
+end
+
+if not ( isloaded("SQLite/3.39.4-GCCcore-12.2.0") ) then
+    load("SQLite/3.39.4-GCCcore-12.2.0")
+end
+
+prepend_path("CMAKE_PREFIX_PATH", root)
+prepend_path("LD_LIBRARY_PATH", pathJoin(root, "lib"))
+prepend_path("PATH", pathJoin(root, "bin"))
+setenv("EBROOTPYTHON", root)
+setenv("EBVERSIONPYTHON", "3.10.8")
+setenv("EBDEVELPYTHON", pathJoin(root, "easybuild/Python-3.10.8-GCCcore-12.2.0-easybuild-devel"))
+
+setenv("EBEXTSLISTPYTHON", "flit-core-3.8.0,pip-22.3.1,setuptools-65.5.0,wheel-0.38.4")
+
+-- Built with EasyBuild version 4.7.0
@@ -0,0 +1,8 @@
+-- Module written by hand, without EasyBuild
+whatis("Name: mytool")
+whatis([==[Description: A tool installed manually, without EasyBuild]==])
+
+local root = "/opt/apps/testapps/common/software/mytool/1.0"
+
+prepend_path("PATH", pathJoin(root, "bin"))
+setenv("MYTOOL_HOME", root)
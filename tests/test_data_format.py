@@ -0,0 +1,64 @@
+import os
+import pytest
+from mods2docs import data_format, utils
+
+
+def make_data():
+    module_info = {"WhatIs Information": ["Description: zlib"], "Loaded Modules": ["GCCcore/12.2.0"],
+                   "Root": "/opt/apps/zlib/1.2.13", "EB Variables": {}, "EB Version": "1.2.13"}
+    gcc_info = {"WhatIs Information": [], "Loaded Modules": [], "Root": None, "EB Variables": {}, "EB Version": None}
+    return {
+        'package_infos': {
+            'icelake': {"Lib|zlib|1.2.13": ("/opt/apps/lib/zlib/1.2.13.lua", "1.2.13"),
+                        "Lib|zlib|1.2.12": ("/opt/apps/lib/zlib/1.2.12.lua", "1.2.12"),
+                        "Compiler|GCC|12.2.0": ("/opt/apps/other/GCC-12.2.0.lua", "12.2.0")},
+            'znver3': {"Lib|zlib|1.2.13": ("/opt/apps/lib/zlib/1.2.13.lua", "1.2.13")},
+        },
+        'latest_version_info': {
+            "Lib|zlib": {'icelake': (module_info, "2024-01-01", "alice"), 'znver3': (module_info, "2024-01-02", None)},
+            "Compiler|GCC": {'icelake': (gcc_info, "2023-05-01", None)},
+        },
+        'fingerprints': {"/opt/apps": {"files": 3}},
+    }
+
+
+def test_full_load_round_trips(tmp_path):
+    data = make_data()
+    data_format.save(tmp_path / "data.m2d", data)
+    assert data_format.load(tmp_path / "data.m2d") == data
+
+
+def test_header_only_load_reads_the_fingerprints(tmp_path, monkeypatch):
+    data_format.save(tmp_path / "data.m2d", make_data())
+
+    def failing_load(file):
+        raise AssertionError("data decoded")
+
+    monkeypatch.setattr(data_format.pickle, "load", failing_load)
+    assert data_format.load(tmp_path / "data.m2d", header_only=True) == {
+        'archs': ['icelake', 'znver3'], 'fingerprints': {"/opt/apps": {"files": 3}}}
+
+
+def test_unreadable_version_is_reported(tmp_path):
+    data_format.save(tmp_path / "data.m2d", make_data())
+    with open(tmp_path / "data.m2d", 'r+b') as f:
+        f.seek(len(data_format.MAGIC))
+        f.write(data_format._PREAMBLE.pack(data_format.FORMAT_VERSION + 1, 0))
+    with pytest.raises(ValueError, match=f"reads format versions {data_format.FORMAT_VERSION}$"):
+        data_format.load(tmp_path / "data.m2d")
+
+
+def test_interrupted_save_keeps_the_previous_file(tmp_path, monkeypatch):
+    path = tmp_path / "data.m2d"
+    utils.save_collected_data(path, make_data())
+    assert not os.path.exists(f"{path}.tmp")
+
+    def failing_save(file_path, data):
+        with open(file_path, 'wb') as f:
+            f.write(b"truncated")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(data_format, "save", failing_save)
+    with pytest.raises(OSError):
+        utils.save_collected_data(path, {})
+    assert data_format.load(path) == make_data()
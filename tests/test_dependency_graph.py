@@ -0,0 +1,85 @@
+from mods2docs.writer.common import PackageTable, DependencyGraph
+
+
+def make_graph(loads):
+    """DependencyGraph of packages in the Tools category, given the modules each loads on each architecture."""
+    archs = sorted({arch for arch_loads in loads.values() for arch in arch_loads})
+    package_infos = {arch: {} for arch in archs}
+    latest_version_info = {}
+    for package, arch_loads in loads.items():
+        for arch, modules in arch_loads.items():
+            package_infos[arch][f"Tools|{package}|1.0"] = (f"/apps/tools/{package}/1.0.lua", "1.0")
+            module_info = {"Loaded Modules": modules}
+            latest_version_info.setdefault(f"Tools|{package}", {})[arch] = (module_info, "2024-01-01", None)
+    package_ref = {package: "Tools" for package in loads}
+    return DependencyGraph(PackageTable(package_infos, latest_version_info), package_ref)
+
+
+def test_latest_version_loaded_on_any_architecture_is_the_edge():
+    graph = make_graph({
+        "app": {"icelake": ["zlib/1.2.9", "zlib/1.2.13", "GCC/12.2.0"], "znver3": ["zlib/1.2.12"]},
+        "zlib": {"icelake": []},
+        "GCC": {"icelake": []},
+    })
+    assert graph.dependencies("app") == [("GCC", "12.2.0", "Tools"), ("zlib", "1.2.13", "Tools")]
+    assert graph.dependents("zlib") == ["app"]
+    assert graph.dependents("app") == []
+
+
+def test_packages_not_found_are_unknown():
+    graph = make_graph({"app": {"icelake": ["missing/2.0"]}})
+    assert graph.dependencies("app") == [("missing", "2.0", "unknown")]
+    assert graph.dependents("missing") == ["app"]
+
+
+def test_closure_follows_dependencies_transitively():
+    graph = make_graph({
+        "app": {"icelake": ["lib/1.0"]},
+        "lib": {"icelake": ["zlib/1.0"]},
+        "zlib": {"icelake": []},
+    })
+    assert graph.closure("app") == {"lib", "zlib"}
+    assert graph.closure("lib") == {"zlib"}
+    assert graph.closure("zlib") == frozenset()
+    assert graph.cycles() == []
+
+
+def test_cycles_are_found():
+    graph = make_graph({
+        "a": {"icelake": ["b/1.0"]},
+        "b": {"icelake": ["c/1.0"]},
+        "c": {"icelake": ["a/1.0", "zlib/1.0"]},
+        "zlib": {"icelake": []},
+    })
+    assert graph.cycles() == [["a", "b", "c"]]
+    # Packages in a cycle depend on themselves, through the others
+    assert graph.closure("a") == {"a", "b", "c", "zlib"}
+
+
+def test_self_loop_is_a_cycle():
+    graph = make_graph({"a": {"icelake": ["a/1.0"]}, "b": {"icelake": ["a/1.0"]}})
+    assert graph.cycles() == [["a"]]
+    assert graph.closure("a") == {"a"}
+    assert graph.closure("b") == {"a"}
+    assert graph.dependents("a") == ["a", "b"]
+
+
+def test_latest_info_fallback_order():
+    dated = ({"Root": "dated"}, "2024-01-01", None)
+    undated = ({"Root": "undated"}, "", None)
+    last = ({"Root": "last"}, "", None)
+    package_infos = {"icelake": {}, "znver3": {}, "cascadelake": {}}
+    latest_version_info = {
+        # The first architecture with a creation date wins
+        "Tools|first": {"icelake": dated, "znver3": undated, "cascadelake": last},
+        "Tools|second": {"icelake": undated, "znver3": dated, "cascadelake": last},
+        # Otherwise the last architecture is used, with or without a date
+        "Tools|undated": {"icelake": undated, "cascadelake": last},
+        "Tools|missing": {"icelake": undated},
+    }
+    table = PackageTable(package_infos, latest_version_info)
+    assert table.latest_info(table.row("Tools", "first")) == {"Root": "dated"}
+    assert table.latest_info(table.row("Tools", "second")) == {"Root": "dated"}
+    assert table.latest_info(table.row("Tools", "undated")) == {"Root": "last"}
+    assert table.latest_info(table.row("Tools", "missing")) is None
+    assert table.latest_info(table.row("Tools", "unknown")) is None
@@ -0,0 +1,33 @@
+import os
+import pytest
+from mods2docs import config
+from mods2docs.parser import lmod
+
+
+@pytest.fixture
+def modulepath(tmp_path, monkeypatch):
+    """A modulepath with two versions of a package and a broken symlink, set as the only modulepath."""
+    package_dir = tmp_path / "modules" / "tools" / "zlib"
+    package_dir.mkdir(parents=True)
+    for version in ("1.2.12", "1.2.13"):
+        (package_dir / f"{version}.lua").write_text(f'whatis([==[Version: {version}]==])\n')
+    os.symlink(tmp_path / "missing.lua", package_dir / "1.0.lua")
+    monkeypatch.setattr(config, "modulepaths", {"icelake": str(tmp_path / "modules")})
+    return tmp_path / "modules"
+
+
+def test_scanned_fingerprint_matches_walk(modulepath):
+    lmod.gather_lua_paths_by_arch()
+    assert lmod.fingerprint_modulepaths(scanned=True) == lmod.fingerprint_modulepaths()
+    assert lmod.fingerprint_modulepaths()[str(modulepath)]['files'] == 3
+
+
+def test_scanned_fingerprint_is_taken_before_parsing(modulepath):
+    lmod.gather_lua_paths_by_arch()
+    scanned = lmod.fingerprint_modulepaths()
+    # A module file changed while collecting makes the collected data stale
+    module_file = modulepath / "tools" / "zlib" / "1.2.13.lua"
+    module_file.write_text('whatis([==[Version: 1.2.13, rebuilt]==])\n')
+    os.utime(module_file, ns=(1, 1))
+    assert lmod.fingerprint_modulepaths(scanned=True) == scanned
+    assert lmod.fingerprint_modulepaths() != scanned
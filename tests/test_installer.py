@@ -0,0 +1,103 @@
+import os
+import pwd
+import subprocess
+import pytest
+from mods2docs.parser import common, lmod
+
+# Uids given to the fixture files, and the names the fake password database gives them
+FAKE_USERS = {60001: "sa_alice", 60002: "bob", 60003: "sa_carol"}
+
+requires_root = pytest.mark.skipif(os.geteuid() != 0, reason="changing file owners needs root")
+
+
+@pytest.fixture
+def fake_users(monkeypatch):
+    """Resolves FAKE_USERS through common.lookup_username, with its per-uid cache emptied before and after."""
+    def getpwuid(uid):
+        if uid not in FAKE_USERS:
+            raise KeyError(uid)
+        return pwd.struct_passwd((FAKE_USERS[uid], "x", uid, uid, "", "/", "/bin/sh"))
+
+    common.lookup_username.cache_clear()
+    monkeypatch.setattr(common.pwd, "getpwuid", getpwuid)
+    yield FAKE_USERS
+    common.lookup_username.cache_clear()
+
+
+@pytest.fixture
+def module_tree(tmp_path):
+    """
+    An EasyBuild-style tree: module files in all/ and symlinks to them in a category directory, the module
+    files and symlinks owned by different uids. Returns the paths of the module files and symlinks.
+    """
+    paths = []
+    for i, (package, file_uid, link_uid) in enumerate([("GCC", 60001, 60002), ("zlib", 60002, 60003),
+                                                       ("Python", 60003, 60001), ("cmake", 0, 60001)]):
+        package_dir = tmp_path / "all" / package
+        category_dir = tmp_path / "tools" / package
+        package_dir.mkdir(parents=True)
+        category_dir.mkdir(parents=True)
+        module_file = package_dir / f"1.{i}.lua"
+        module_file.write_text('whatis("Description: test")\n')
+        link = category_dir / f"1.{i}.lua"
+        link.symlink_to(module_file)
+        os.lchown(module_file, file_uid, file_uid)
+        os.lchown(link, link_uid, link_uid)
+        paths += [str(module_file), str(link)]
+    return paths
+
+
+def ls_owner(path):
+    """Owner uid of path as ``ls -ln`` lists it: of a symlink itself, not its target."""
+    return int(subprocess.run(["ls", "-ldn", path], capture_output=True, text=True, check=True).stdout.split()[2])
+
+
+def expected_installer(owner):
+    return owner[3:] if owner and owner.startswith("sa_") else None
+
+
+@requires_root
+def test_installer_matches_ls(fake_users, module_tree):
+    for path in module_tree:
+        owner = fake_users.get(ls_owner(path))
+        assert common.extract_installer(path) == expected_installer(owner), path
+
+
+@requires_root
+def test_installer_from_cached_stat_matches_ls(fake_users, module_tree):
+    # As collection calls it: with the stat results cached by the modulepath scan
+    lmod._dir_entries = {}
+    for path in module_tree:
+        with os.scandir(os.path.dirname(path)) as entries:
+            lmod._dir_entries.update({entry.path: entry for entry in entries})
+    try:
+        for path in module_tree:
+            owner = fake_users.get(ls_owner(path))
+            assert common.extract_installer(path, lmod.stat_lua_file) == expected_installer(owner), path
+    finally:
+        lmod._dir_entries = {}
+
+
+@requires_root
+def test_installer_of_real_users_matches_ls_l(module_tree):
+    # Without the fake password database, owners are compared by name with what ls -l prints
+    common.lookup_username.cache_clear()
+    for path in module_tree:
+        owner = subprocess.run(["ls", "-ld", path], capture_output=True, text=True, check=True).stdout.split()[2]
+        if owner.isdigit():
+            owner = None
+        assert common.extract_installer(path) == expected_installer(owner), path
+
+
+def test_installer_of_missing_file_is_none(tmp_path):
+    assert common.extract_installer(str(tmp_path / "missing.lua")) is None
+
+
+@requires_root
+def test_uids_are_resolved_once(fake_users, module_tree, monkeypatch):
+    calls = []
+    getpwuid = common.pwd.getpwuid
+    monkeypatch.setattr(common.pwd, "getpwuid", lambda uid: calls.append(uid) or getpwuid(uid))
+    for path in module_tree * 3:
+        common.extract_installer(path)
+    assert sorted(calls) == sorted(set(calls))
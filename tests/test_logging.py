@@ -0,0 +1,57 @@
+import os
+import sys
+import signal
+import logging
+import subprocess
+from mods2docs import utils
+
+
+def read(path):
+    with open(path) as file:
+        return file.read()
+
+
+def test_info_records_are_buffered_and_warnings_flushed(tmp_path):
+    logfile = tmp_path / "buffered.log"
+    utils.write_log(logfile)
+    utils.append_log("info", logfile)
+    assert read(logfile) == ""
+    utils.append_log("warning", logfile, level=logging.WARNING)
+    assert read(logfile) == "info\nwarning\n"
+
+
+def test_records_are_flushed_every_n_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "LOG_FLUSH_RECORDS", 3)
+    logfile = tmp_path / "counted.log"
+    utils.write_log(logfile)
+    for i in range(4):
+        utils.append_log(f"record {i}", logfile)
+    assert read(logfile) == "record 0\nrecord 1\nrecord 2\n"
+
+
+def test_records_are_flushed_after_an_interval(tmp_path, monkeypatch):
+    logfile = tmp_path / "timed.log"
+    utils.write_log(logfile)
+    utils.append_log("first", logfile)
+    assert read(logfile) == ""
+    monkeypatch.setattr(utils, "LOG_FLUSH_SECONDS", 0.0)
+    utils.append_log("second", logfile)
+    assert read(logfile) == "first\nsecond\n"
+
+
+def test_sigterm_writes_buffered_records(tmp_path):
+    logfile = tmp_path / "killed.log"
+    script = (
+        "import os, signal, time\n"
+        "from mods2docs import utils\n"
+        "utils.setup_logging(False)\n"
+        f"utils.write_log({str(logfile)!r})\n"
+        f"utils.append_log('before the time limit', {str(logfile)!r})\n"
+        "os.kill(os.getpid(), signal.SIGTERM)\n"
+        "time.sleep(10)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, timeout=30)
+    assert result.returncode == 128 + signal.SIGTERM
+    assert read(logfile) == "before the time limit\n"
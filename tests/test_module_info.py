@@ -0,0 +1,41 @@
+import os
+import json
+import pytest
+from conftest import FIXTURES_DIR
+from mods2docs.parser import lmod
+
+MODULES_DIR = os.path.join(FIXTURES_DIR, "modules")
+MODULE_FILES = sorted(name for name in os.listdir(MODULES_DIR) if name.endswith(".lua"))
+
+
+def expected_module_info(name):
+    with open(os.path.join(MODULES_DIR, name[:-len(".lua")] + ".json")) as file:
+        return json.load(file)
+
+
+@pytest.mark.parametrize("name", MODULE_FILES)
+def test_module_info_matches_golden_output(name):
+    assert lmod.parse_lua_file(os.path.join(MODULES_DIR, name)) == expected_module_info(name)
+
+
+def test_extract_patterns():
+    with open(os.path.join(MODULES_DIR, "foss-2022b.lua")) as file:
+        data = lmod.extract_patterns(file.read())
+    assert data["loaded_modules"] == ["GCC/12.2.0", "OpenMPI/4.1.4-GCC-12.2.0", "FlexiBLAS/3.2.1-GCC-12.2.0"]
+    assert data["root"] == "/opt/apps/testapps/el7/software/foss/2022b"
+    # Only setenv() of string literals: EBROOTFOSS and EBDEVELFOSS are set from root and pathJoin()
+    assert data["env_vars"] == [("EBVERSIONFOSS", "2022b")]
+
+
+@pytest.mark.parametrize("content, env_vars, suffix", [
+    # A literal root wins over EBROOT variables set with pathJoin and over the alphabetical fallback
+    ('setenv("EBROOTZLIB", pathJoin(root, "x"))\nsetenv("EBROOTGCCCORE", root)\n',
+     {"EBROOTAAA": "x", "EBROOTGCCCORE": "y"}, "GCCCORE"),
+    # Without one, the first EBROOT variable in sort order
+    ('setenv("EBROOTANSYS", pathJoin(base, "v231"))\n', {"EBROOTZLIB": "x", "EBROOTANSYS": "y"}, "ANSYS"),
+    # The last line of the file has no newline
+    ('local root = "/x"\nsetenv("EBROOTFOO", root)', {}, "FOO"),
+    ('setenv("MYTOOL_HOME", root)\n', {"MYTOOL_HOME": "/x"}, ""),
+])
+def test_extract_package_suffix(content, env_vars, suffix):
+    assert lmod.extract_package_suffix(content, env_vars) == suffix
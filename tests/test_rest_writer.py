@@ -0,0 +1,67 @@
+import os
+from mods2docs import config, utils
+from mods2docs.writer import rest
+
+
+def make_table(versions):
+    """package_infos, package_ref and latest_version_info of Tools packages, given their versions by architecture."""
+    package_infos = {}
+    latest_version_info = {}
+    for package, arch_versions in versions.items():
+        for arch, package_versions in arch_versions.items():
+            for version in package_versions:
+                package_infos.setdefault(arch, {})[f"Tools|{package}|{version}"] = (
+                    f"/apps/{arch}/tools/{package}/{version}.lua", version)
+            module_info = {
+                "Root": f"/apps/{arch}/software/{package}/{package_versions[-1]}",
+                "WhatIs Information": [f"Description: {package} for tests", f"URL: https://example.org/{package}"],
+                "Loaded Modules": [f"zlib/{versions['zlib'][arch][-1]}"] if package != "zlib" else [],
+            }
+            latest_version_info.setdefault(f"Tools|{package}", {})[arch] = (module_info, "2024-01-01", None)
+    package_ref = {package: "Tools" for package in sorted(versions, key=str.casefold)}
+    return package_infos, package_ref, latest_version_info
+
+
+VERSIONS = {
+    "zlib": {"icelake": ["1.2.12", "1.2.13"], "znver3": ["1.2.13"]},
+    "curl": {"icelake": ["8.0.1"], "znver3": ["8.0.1", "8.1.0"]},
+    "GCC": {"icelake": ["12.2.0"]},
+}
+
+
+def test_parallel_rendering_matches_serial():
+    package_infos, package_ref, latest_version_info = make_table(VERSIONS)
+    serial = utils.render_output(rest.write_all_files, "Tests", "tests", package_infos, package_ref,
+                                 latest_version_info)
+    with utils.process_pool(2) as executor:
+        parallel = utils.render_output(rest.write_all_files, "Tests", "tests", package_infos, package_ref,
+                                       latest_version_info, executor)
+    assert parallel == serial
+    assert os.path.normpath(rest.ml_file_path("curl", "tests")) in serial
+
+
+def test_merge_ml_files_keeps_the_versions_of_both():
+    first = rest.render_ml_file("zlib", {"icelake": ["1.2.12"], "znver3": []})
+    second = rest.render_ml_file("zlib", {"icelake": ["1.2.12", "1.2.13"], "znver3": ["1.2.13"]})
+    merged = rest.merge_ml_files("zlib", first, second, ["icelake", "znver3"])
+    assert merged == rest.render_ml_file("zlib", {"icelake": ["1.2.12", "1.2.13"], "znver3": ["1.2.13"]})
+
+
+def write_two_titles(merge_ml):
+    """Renders two titles sharing an output directory, with different versions of zlib, and returns the ml file."""
+    def write():
+        for title, arch_versions in (("Icelake", {"icelake": ["1.2.12"]}), ("Znver3", {"znver3": ["1.2.13"]})):
+            package_infos, package_ref, latest_version_info = make_table({"zlib": arch_versions})
+            rest.write_all_files(title, "tests", package_infos, package_ref, latest_version_info, merge_ml=merge_ml)
+    return utils.render_output(write)[os.path.normpath(rest.ml_file_path("zlib", "tests"))]
+
+
+def test_titles_sharing_an_output_dir_merge_ml_files(monkeypatch):
+    monkeypatch.setattr(config, "modulepaths", {"icelake": "/apps/icelake", "znver3": "/apps/znver3"})
+    ml_file = write_two_titles(merge_ml=True)
+    assert rest.parse_ml_file(ml_file, ["icelake", "znver3"]) == {"icelake": ["1.2.12"], "znver3": ["1.2.13"]}
+
+
+def test_ml_files_are_replaced_without_merge_ml():
+    ml_file = write_two_titles(merge_ml=False)
+    assert rest.parse_ml_file(ml_file, ["icelake", "znver3"]) == {"icelake": [], "znver3": ["1.2.13"]}
@@ -0,0 +1,46 @@
+import os
+import json
+from mods2docs import utils
+
+
+def stage(manifest_file, generated_dirs, files):
+    """Runs staged_output writing files, a dict of contents by path, and returns its counts."""
+    with utils.staged_output(str(manifest_file), generated_dirs=[str(d) for d in generated_dirs]) as counts:
+        for filepath, content in files.items():
+            utils.write_file(str(filepath), content)
+    return counts
+
+
+def test_files_no_longer_written_are_deleted(tmp_path):
+    output_dir = tmp_path / "stacks"
+    manifest_file = tmp_path / "manifest.json"
+    stage(manifest_file, [output_dir], {output_dir / "a.rst": "a\n", output_dir / "b.rst": "b\n"})
+    counts = stage(manifest_file, [output_dir], {output_dir / "a.rst": "a\n"})
+    assert counts == {'written': 0, 'unchanged': 1, 'deleted': 1}
+    assert sorted(os.listdir(output_dir)) == ["a.rst"]
+    assert json.loads(manifest_file.read_text()) == [str(output_dir / "a.rst")]
+
+
+def test_missing_manifest_is_seeded_from_generated_directories(tmp_path):
+    output_dir = tmp_path / "stacks"
+    (output_dir / "Tools").mkdir(parents=True)
+    (output_dir / "Tools" / "removed.rst").write_text("removed\n")
+    (output_dir / "kept.rst").write_text("kept\n")
+    other_dir = tmp_path / "docs"
+    other_dir.mkdir()
+    (other_dir / "hand-written.rst").write_text("hand-written\n")
+
+    counts = stage(tmp_path / "manifest.json", [output_dir], {output_dir / "kept.rst": "kept\n"})
+    assert counts == {'written': 0, 'unchanged': 1, 'deleted': 1}
+    assert not (output_dir / "Tools" / "removed.rst").exists()
+    assert (other_dir / "hand-written.rst").exists()
+
+
+def test_written_files_leave_no_temporary_files(tmp_path):
+    filepath = tmp_path / "index.rst"
+    assert utils.write_file_if_changed(str(filepath), "first\n")
+    assert utils.write_file_if_changed(str(filepath), "second\n")
+    assert not utils.write_file_if_changed(str(filepath), "second\n")
+    assert os.listdir(tmp_path) == ["index.rst"]
+    assert filepath.read_text() == "second\n"
+    assert os.stat(filepath).st_mode & 0o777 == 0o666 & ~utils._umask
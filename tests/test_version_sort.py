@@ -0,0 +1,76 @@
+import pytest
+from mods2docs.parser import lmod
+
+
+def newest_first(versions, category="tools", package="pkg"):
+    return sorted(versions, key=lambda version: lmod.version_sort_key(f"{category}/{package}/{version}"))
+
+
+@pytest.mark.parametrize("newer, older", [
+    # Numeric, not lexical, ordering of each digit run
+    ("1.10", "1.9"),
+    ("12.10.0", "12.2.0"),
+    ("2.0", "1.99.99"),
+    # Toolchain suffixes: the package version comes first, then the toolchain's
+    ("3.11.3-GCCcore-12.3.0", "3.10.8-GCCcore-12.2.0"),
+    ("1.2.13-GCCcore-13.2.0", "1.2.13-GCCcore-12.3.0"),
+    ("1.2.13-GCCcore-11.3.0", "1.2.13-GCCcore-9.3.0"),
+    # Multi-level toolchains
+    ("4.1.5-GCC-12.3.0", "4.1.5-GCC-12.2.0"),
+    ("1.24.1-foss-2023a", "1.24.1-foss-2022b"),
+    ("2.3.0-foss-2023a-CUDA-12.1.1", "2.3.0-foss-2022b-CUDA-12.1.1"),
+    ("0.9-iimpi-2023a-Python-3.11.3", "0.9-iimpi-2023a-Python-3.10.8"),
+    # CUDA suffixes
+    ("2.1.2-foss-2023a-CUDA-12.1.1", "2.1.2-foss-2023a-CUDA-11.7.0"),
+    ("2.1.2-foss-2023a-CUDA-12.10", "2.1.2-foss-2023a-CUDA-12.9"),
+    # Release candidates and betas sort after the releases they share a prefix with
+    ("1.0rc2", "1.0rc1"),
+    ("2.0beta10", "2.0beta9"),
+    ("1.0", "1.0rc1"),
+    ("1.1", "1.1-beta"),
+])
+def test_newer_version_sorts_first(newer, older):
+    assert newest_first([older, newer]) == [newer, older]
+    assert newest_first([newer, older]) == [newer, older]
+
+
+def test_versions_are_sorted_within_package():
+    versions = ["1.9-GCCcore-12.2.0", "1.10-GCCcore-11.3.0", "1.10-GCCcore-12.2.0", "1.10-GCCcore-12.2.0-CUDA-12.0.0",
+                "1.2", "1.10rc1"]
+    assert newest_first(versions) == ["1.10-GCCcore-12.2.0", "1.10-GCCcore-12.2.0-CUDA-12.0.0",
+                                      "1.10-GCCcore-11.3.0", "1.10rc1", "1.9-GCCcore-12.2.0", "1.2"]
+
+
+def test_category_and_package_sort_before_version():
+    paths = ["tools/zlib/9.0", "bio/zlib/1.0", "tools/Bzip2/1.0", "tools/bzip2/2.0"]
+    assert sorted(paths, key=lmod.version_sort_key) == ["bio/zlib/1.0", "tools/bzip2/2.0", "tools/Bzip2/1.0",
+                                                        "tools/zlib/9.0"]
+
+
+def test_group_paths():
+    paths = [
+        ("/apps/tools/Python/3.10.8-GCCcore-12.2.0.lua", "tools/Python/3.10.8-GCCcore-12.2.0"),
+        ("/apps/lib/zlib/1.2.12.lua", "lib/zlib/1.2.12"),
+        ("/apps/tools/Python/3.11.3-GCCcore-12.3.0.lua", "tools/Python/3.11.3-GCCcore-12.3.0"),
+        ("/apps/lib/zlib/1.2.13.lua", "lib/zlib/1.2.13"),
+        ("/apps/tools/Python/3.9.6.lua", "tools/Python/3.9.6"),
+    ]
+    groups = lmod.group_paths(paths)
+    assert list(groups) == [("Lib", "zlib"), ("Tools", "Python")]
+    assert groups[("Lib", "zlib")] == [("/apps/lib/zlib/1.2.13.lua", "1.2.13"), ("/apps/lib/zlib/1.2.12.lua", "1.2.12")]
+    assert [version for _, version in groups[("Tools", "Python")]] == ["3.11.3-GCCcore-12.3.0",
+                                                                        "3.10.8-GCCcore-12.2.0", "3.9.6"]
+
+
+def test_group_paths_keeps_order_found_for_equal_versions():
+    # The same module file on two modulepaths: the first one found is used
+    paths = [
+        ("/apps/arch/tools/GCC/12.2.0.lua", "tools/GCC/12.2.0"),
+        ("/apps/common/tools/GCC/12.3.0.lua", "tools/GCC/12.3.0"),
+        ("/apps/common/tools/GCC/12.2.0.lua", "tools/GCC/12.2.0"),
+        ("/apps/arch/Tools/GCC/12.3.0.lua", "Tools/GCC/12.3.0"),
+    ]
+    assert lmod.group_paths(paths) == {("Tools", "GCC"): [
+        ("/apps/common/tools/GCC/12.3.0.lua", "12.3.0"), ("/apps/arch/Tools/GCC/12.3.0.lua", "12.3.0"),
+        ("/apps/arch/tools/GCC/12.2.0.lua", "12.2.0"), ("/apps/common/tools/GCC/12.2.0.lua", "12.2.0"),
+    ]}